@@ -0,0 +1,240 @@
+import numpy as np
+from .sf3.sf3_bounds import Sf3Bounds
+from .sf3.kaitaistruct import KaitaiStream
+
+## Bounding volumes of exported models: the box, a tight sphere and an
+## optional binned SAH BVH over the triangles, flattened depth first.
+
+# Directions whose extreme points seed the bounding sphere (EPOS-26 from
+# Larsson's "Fast and Tight Fitting Bounding Spheres").
+SPHERE_DIRECTIONS = np.array([
+    (1,0,0), (0,1,0), (0,0,1),
+    (1,1,1), (1,1,-1), (1,-1,1), (1,-1,-1),
+    (1,1,0), (1,-1,0), (1,0,1), (1,0,-1), (0,1,1), (0,1,-1),
+], dtype=np.float64)
+
+def circumsphere(points):
+    ## Smallest sphere with all of up to four points on its surface.
+    if len(points) == 0:
+        return (np.zeros(3), -1.0)
+    if len(points) == 1:
+        return (points[0], 0.0)
+    if len(points) == 2:
+        center = (points[0] + points[1]) * 0.5
+        return (center, np.linalg.norm(points[0] - center))
+    if len(points) == 3:
+        (a, b, c) = points
+        (ab, ac) = (b - a, c - a)
+        n = np.cross(ab, ac)
+        denominator = 2.0 * n.dot(n)
+        if denominator < 1e-30:
+            return widest_sphere(points)
+        center = a + (ac.dot(ac) * np.cross(n, ab) + ab.dot(ab) * np.cross(ac, n)) / denominator
+        return (center, np.linalg.norm(a - center))
+    (a, b, c, d) = points
+    matrix = 2.0 * np.array([b - a, c - a, d - a])
+    if abs(np.linalg.det(matrix)) < 1e-30:
+        return widest_sphere(points)
+    rhs = np.array([b.dot(b) - a.dot(a), c.dot(c) - a.dot(a), d.dot(d) - a.dot(a)])
+    center = np.linalg.solve(matrix, rhs)
+    return (center, np.linalg.norm(a - center))
+
+def widest_sphere(points):
+    ## Fallback for degenerate point sets: the sphere over the farthest pair.
+    pairs = [(i, j) for i in range(len(points)) for j in range(i+1, len(points))]
+    (i, j) = max(pairs, key=lambda p: np.linalg.norm(points[p[0]] - points[p[1]]))
+    return circumsphere([points[i], points[j]])
+
+def outside(sphere, point):
+    return sphere[1] * (1 + 1e-7) + 1e-12 < np.linalg.norm(point - sphere[0])
+
+def minimal_sphere(points, boundary=[]):
+    ## Welzl's algorithm, only meant for a handful of points.
+    sphere = circumsphere(boundary)
+    if len(boundary) == 4:
+        return sphere
+    for i in range(len(points)):
+        if outside(sphere, points[i]):
+            sphere = minimal_sphere(points[:i], boundary + [points[i]])
+    return sphere
+
+def bounding_sphere(points):
+    ## Minimal sphere of a core set of points, seeded with the extreme
+    ## points along a fixed set of directions. While some point lies outside,
+    ## the farthest one joins the set. Once nothing is outside, the sphere is
+    ## the exact minimal one; past a cap it is grown instead, which is never
+    ## tight but always terminates quickly.
+    points = points.astype(np.float64)
+    projections = points @ SPHERE_DIRECTIONS.T
+    extremes = np.unique(np.concatenate((projections.argmin(axis=0), projections.argmax(axis=0))))
+    core = list(points[extremes])
+    (center, radius) = minimal_sphere(core)
+    for _ in range(256):
+        distances = np.linalg.norm(points - center, axis=1)
+        i = distances.argmax()
+        if distances[i] <= radius * (1 + 1e-7):
+            return (center, radius)
+        if len(core) < 64:
+            core.insert(0, points[i])
+            (center, radius) = minimal_sphere(core)
+        else:
+            grown = (radius + distances[i]) * 0.5
+            center = center + (points[i] - center) * ((grown - radius) / distances[i])
+            radius = grown
+    return (center, np.linalg.norm(points - center, axis=1).max())
+
+def surface_areas(low, high):
+    extent = np.maximum(high - low, 0.0)
+    return extent[...,0]*extent[...,1] + extent[...,1]*extent[...,2] + extent[...,2]*extent[...,0]
+
+def cheapest_splits(segment, slots, low, high, segments, bins):
+    ## Evaluates the SAH cost of every bin boundary along every axis for
+    ## each node and returns the cheapest cost and its axis*(bins-1)+cut.
+    keys = ((segment[:,None] * 3 + np.arange(3)) * bins + slots).ravel()
+    bin_counts = np.bincount(keys, minlength=segments*3*bins).reshape(segments, 3, bins)
+    box_low = np.empty((3, segments*3*bins))
+    box_high = np.empty((3, segments*3*bins))
+    for k in range(3):
+        box_low[k] = np.inf
+        box_high[k] = -np.inf
+        np.minimum.at(box_low[k], keys, np.repeat(low[:,k], 3))
+        np.maximum.at(box_high[k], keys, np.repeat(high[:,k], 3))
+    box_low = box_low.T.reshape(segments, 3, bins, 3)
+    box_high = box_high.T.reshape(segments, 3, bins, 3)
+    left_counts = np.cumsum(bin_counts, axis=2)[:,:,:-1]
+    right_counts = np.cumsum(bin_counts[:,:,::-1], axis=2)[:,:,::-1][:,:,1:]
+    left_areas = surface_areas(np.minimum.accumulate(box_low, axis=2)[:,:,:-1],
+                               np.maximum.accumulate(box_high, axis=2)[:,:,:-1])
+    right_areas = surface_areas(np.minimum.accumulate(box_low[:,:,::-1], axis=2)[:,:,::-1][:,:,1:],
+                                np.maximum.accumulate(box_high[:,:,::-1], axis=2)[:,:,::-1][:,:,1:])
+    costs = (left_counts * left_areas + right_counts * right_areas).reshape(segments, -1)
+    costs[((left_counts == 0) | (right_counts == 0)).reshape(segments, -1)] = np.inf
+    best = costs.argmin(axis=1)
+    return (costs[np.arange(segments), best], best)
+
+def build_bvh(positions, faces, leaf_size=4, bins=16):
+    ## Returns the flattened node bounds (N,6), node data (N,2) and the
+    ## triangle numbers in leaf order.
+    ##
+    ## The tree is built breadth first so that every level is binned and
+    ## split for all of its nodes at once. Each node owns a contiguous range
+    ## of perm and its children split that range in two, so perm ends up in
+    ## depth first leaf order by itself.
+    corners = positions[faces.reshape(-1, 3)].astype(np.float64)
+    low = corners.min(axis=1)
+    high = corners.max(axis=1)
+    centroids = (low + high) * 0.5
+    total = len(low)
+    perm = np.arange(total)
+    capacity = max(1, 2 * total - 1)
+    node_bounds = np.zeros((capacity, 6))
+    node_start = np.zeros(capacity, dtype=np.int64)
+    node_count = np.zeros(capacity, dtype=np.int64)
+    children = np.full((capacity, 2), -1, dtype=np.int64)
+    levels = []
+    nodes = np.array([0])
+    starts = np.array([0])
+    counts = np.array([total])
+    next_node = 1
+    while len(nodes):
+        segments = len(nodes)
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        segment = np.repeat(np.arange(segments), counts)
+        positions_in_perm = np.repeat(starts - offsets, counts) + np.arange(len(segment))
+        tris = perm[positions_in_perm]
+        (tri_low, tri_high, tri_centroids) = (low[tris], high[tris], centroids[tris])
+        seg_low = np.minimum.reduceat(tri_low, offsets)
+        seg_high = np.maximum.reduceat(tri_high, offsets)
+        node_bounds[nodes] = np.concatenate((seg_low, seg_high), axis=1)
+        node_start[nodes] = starts
+        node_count[nodes] = counts
+
+        # Bin every triangle along all three axes of its node's centroid box.
+        # Deep levels only hold small nodes, which need fewer bins.
+        level_bins = int(min(bins, max(2, counts.max())))
+        c_low = np.minimum.reduceat(tri_centroids, offsets)
+        c_extent = np.maximum.reduceat(tri_centroids, offsets) - c_low
+        scale = np.where(0.0 < c_extent, level_bins / np.maximum(c_extent, 1e-30), 0.0)
+        slots = np.minimum(((tri_centroids - c_low[segment]) * scale[segment]).astype(np.int64), level_bins - 1)
+        best_cost = np.empty(segments)
+        best = np.empty(segments, dtype=np.int64)
+        # Bound the size of the per bin arrays by going through the nodes of
+        # wide levels in chunks.
+        chunk = max(1, (1 << 18) // level_bins)
+        for first in range(0, segments, chunk):
+            last = min(first + chunk, segments)
+            (a, b) = (offsets[first], offsets[last] if last < segments else len(segment))
+            (best_cost[first:last], best[first:last]) = cheapest_splits(
+                segment[a:b] - first, slots[a:b], tri_low[a:b], tri_high[a:b], last - first, level_bins)
+        (axis, cut) = (best // (level_bins - 1), best % (level_bins - 1))
+
+        # Split where that beats a leaf. If nothing does but the leaf would
+        # be huge, halve it instead.
+        splittable = leaf_size < counts
+        sah = splittable & (best_cost < counts * surface_areas(seg_low, seg_high))
+        halve = splittable & ~sah & (leaf_size * 16 < counts)
+        inner = sah | halve
+        local = np.arange(len(segment)) - offsets[segment]
+        left = np.where(sah[segment],
+                        slots[np.arange(len(segment)), axis[segment]] <= cut[segment],
+                        local < counts[segment] // 2)
+        perm[positions_in_perm] = tris[np.lexsort((~left, segment))]
+
+        parents = nodes[inner]
+        left_sizes = np.bincount(segment, weights=left, minlength=segments).astype(np.int64)[inner]
+        lefts = next_node + 2 * np.arange(len(parents))
+        children[parents, 0] = lefts
+        children[parents, 1] = lefts + 1
+        next_node += 2 * len(parents)
+        levels.append(parents)
+        nodes = np.stack((lefts, lefts + 1), axis=1).ravel()
+        starts = np.stack((starts[inner], starts[inner] + left_sizes), axis=1).ravel()
+        counts = np.stack((left_sizes, counts[inner] - left_sizes), axis=1).ravel()
+
+    # Lay the nodes out depth first: a left child follows its parent, the
+    # right child follows the whole left subtree.
+    sizes = np.ones(next_node, dtype=np.int64)
+    for parents in reversed(levels):
+        sizes[parents] += sizes[children[parents, 0]] + sizes[children[parents, 1]]
+    order = np.zeros(next_node, dtype=np.int64)
+    for parents in levels:
+        order[children[parents, 0]] = order[parents] + 1
+        order[children[parents, 1]] = order[parents] + 1 + sizes[children[parents, 0]]
+    leaf = children[:next_node, 0] < 0
+    data = np.zeros((next_node, 2), dtype=np.uint32)
+    data[order[leaf], 0] = node_start[:next_node][leaf]
+    data[order[leaf], 1] = node_count[:next_node][leaf]
+    data[order[~leaf], 0] = order[children[:next_node][~leaf, 1]]
+    flat = np.zeros((next_node, 6), dtype=np.float32)
+    flat[order] = node_bounds[:next_node]
+    return (flat, data, perm.astype(np.uint32))
+
+def build_bounds(positions, faces, bvh=False, leaf_size=4):
+    ## Returns an Sf3Bounds for the (N,3) positions and index buffer.
+    bounds = Sf3Bounds()
+    bounds.magic = Sf3Bounds.MAGIC
+    used = positions[np.unique(faces)] if len(faces) else np.zeros((1, 3), dtype=np.float32)
+    bounds.aabb = np.concatenate((used.min(axis=0), used.max(axis=0))).astype(np.float32)
+    center = bounding_sphere(used)[0].astype(np.float32)
+    # Measure from the rounded center and round up, so that the stored
+    # sphere still holds every point.
+    radius = np.linalg.norm(used.astype(np.float64) - center, axis=1).max()
+    bounds.sphere = np.array([*center, np.nextafter(np.float32(radius), np.float32(np.inf))], dtype=np.float32)
+    (nodes, data, triangles) = (np.zeros((0, 6), np.float32), np.zeros((0, 2), np.uint32), np.zeros(0, np.uint32))
+    if bvh and len(faces):
+        (nodes, data, triangles) = build_bvh(positions, faces, leaf_size)
+    bounds.node_count = len(nodes)
+    bounds.node_bounds = nodes.ravel()
+    bounds.node_data = data.ravel()
+    bounds.triangle_count = len(triangles)
+    bounds.triangles = triangles
+    return bounds
+
+def export_bounds(file, positions, faces, config={}):
+    print("Exporting bounds to "+file)
+    bounds = build_bounds(positions, faces, config['export_bvh'], config['bvh_leaf_size'])
+    bounds._check()
+    f = open(file, 'wb')
+    with KaitaiStream(f) as _io:
+        bounds._write(_io)
+    return file
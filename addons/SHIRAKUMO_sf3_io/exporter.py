@@ -3,12 +3,20 @@ import os
 import binascii
 import tempfile
 import mimetypes
+import numpy as np
 from bpy.types import Operator
 from bpy_extras.io_utils import ExportHelper
 from .sf3.sf3_model import Sf3Model
 from .sf3.sf3_archive import Sf3Archive
 from .sf3.sf3_image import Sf3Image
 from .sf3.kaitaistruct import KaitaiStream
+from .optimize import cache_statistics, optimize_vertex_cache, optimize_vertex_fetch
+from .simplify import simplify
+from .meshlets import export_meshlets
+from .bounds import export_bounds
+from .sf3.formats import SIDECARS, sidecar_path
+from .sf3.sf3_meshlets import Sf3Meshlets
+from .sf3.sf3_bounds import Sf3Bounds
 
 def message_box(message="", title="SF3", icon='INFO'):
     def draw(self, context):
@@ -27,17 +35,17 @@ def node_input(node, input):
     return None
 
 def save_image(file, src_image, config={}):
-    if config.image_type == 'None':
+    if config['image_type'] == 'NONE':
         return None
-    if config.image_type == 'SF3':
+    if config['image_type'] == 'SF3':
         return export_image(file, src_image, config)
     image = src_image.copy()
     image.update()
     image.scale(*src_image.size)
-    if config.image_type != 'AUTO':
-        image.file_format = config.image_type
+    if config['image_type'] != 'AUTO':
+        image.file_format = config['image_type']
     image.filepath_raw = file
-    if config.image_type in ["JPEG", "WEBP"]:
+    if config['image_type'] in ["JPEG", "WEBP"]:
         image.save(quality=config['image_quality'])
     else:
         image.save()
@@ -45,42 +53,106 @@ def save_image(file, src_image, config={}):
     return file
 
 def zup2yup(x):
-    for i in range(0, len(x), 3):
-        y = x[i+1]
-        x[i+1] = x[i+2]
-        x[i+2] = -y
+    x = x[:, (0, 2, 1)]
+    x[:, 2] *= -1
     return x
 
+def foreach_array(collection, attr, width):
+    buf = np.empty(len(collection)*width, dtype=np.float32)
+    collection.foreach_get(attr, buf)
+    return buf.reshape(-1, width)
+
 def flatten_vertex_attributes(vertex_attributes, lengths):
-    offset = 0
+    ## Interleaves the per-attribute arrays into one (N, stride) buffer.
     stride = sum(lengths)
     count = len(vertex_attributes[0]) // lengths[0]
-    vertices = [0.0] * (stride*count)
+    vertices = np.empty((count, stride), dtype=np.float32)
+    offset = 0
     for a in range(len(vertex_attributes)):
-        attr = vertex_attributes[a]
-        s = 0
-        o = offset
-        for v in range(count):
-            for i in range(lengths[a]):
-                vertices[o+i] = attr[s]
-                s += 1
-            o += stride
+        vertices[:, offset:offset+lengths[a]] = np.reshape(vertex_attributes[a], (count, lengths[a]))
         offset += lengths[a]
     return vertices
 
-def deduplicate_vertices(vertices, stride):
-    set = {}
-    out_indices = []
-    out_vertices = []
-    for i in range(0, len(vertices), stride):
-        vertex = tuple(vertices[i:i+stride])
-        index = set.get(vertex)
-        if index is None:
-            index = len(set)
-            set[vertex] = index
-            out_vertices.extend(vertex)
-        out_indices.append(index)
-    return (out_vertices, out_indices)
+def unique_rows(keys):
+    ## Returns (first, inverse) for the unique rows of a 2D integer array, like
+    ## np.unique(..., axis=0). Rows are hashed to 64 bits (FNV-style) and the
+    ## hashes sorted, which is much faster than sorting whole rows. If any
+    ## hash collides we fall back to sorting the rows as byte strings.
+    hashes = np.zeros(len(keys), dtype=np.uint64)
+    for c in range(keys.shape[1]):
+        hashes *= np.uint64(0x100000001B3)
+        hashes ^= keys[:, c].astype(np.uint64)
+    _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    if not np.array_equal(keys, keys[first[inverse]]):
+        rows = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.itemsize * keys.shape[1]))).ravel()
+        _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+    return (first, inverse)
+
+def deduplicate_vertices(vertices, stride, keys=None):
+    ## Merges vertices with identical keys, by default their bits, and
+    ## renumbers the remaining ones by first occurrence so the output stays
+    ## stable.
+    vertices = np.reshape(vertices, (-1, stride)).astype(np.float32)
+    if keys is None:
+        # Adding zero turns -0.0 into 0.0, which compare equal as floats.
+        keys = (vertices + np.float32(0)).view(np.uint32)
+    (first, inverse) = unique_rows(keys)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(order), dtype=np.uint32)
+    rank[order] = np.arange(len(order), dtype=np.uint32)
+    return (vertices[first[order]], rank[inverse])
+
+def weld_keys(vertices, lengths, epsilons):
+    ## Quantizes every attribute to a grid with the attribute's tolerance as
+    ## the cell size, so that vertices in the same cell get identical keys.
+    ## Attributes with a tolerance of zero are keyed on their exact bits.
+    keys = np.empty(vertices.shape, dtype=np.int64)
+    offset = 0
+    for (length, epsilon) in zip(lengths, epsilons):
+        columns = vertices[:, offset:offset+length]
+        if 0 < epsilon:
+            keys[:, offset:offset+length] = np.floor(columns / epsilon + 0.5)
+        else:
+            keys[:, offset:offset+length] = (columns + np.float32(0)).view(np.int32)
+        offset += length
+    return keys
+
+def remove_degenerate_faces(vertices, faces):
+    ## Drops triangles that welding collapsed, along with the vertices no
+    ## longer referenced, see optimize_vertex_fetch.
+    triangles = faces.reshape(-1, 3)
+    keep = ((triangles[:, 0] != triangles[:, 1]) &
+            (triangles[:, 1] != triangles[:, 2]) &
+            (triangles[:, 2] != triangles[:, 0]))
+    return optimize_vertex_fetch(vertices, triangles[keep].ravel())
+
+def report(config, message):
+    print(message)
+    if 'report' in config:
+        config['report']({'INFO'}, message)
+
+def lod_path(file, level):
+    ## foo.mod.sf3 becomes foo.lod1.mod.sf3, foo.sf3 becomes foo.lod1.sf3
+    (base, ext) = os.path.splitext(file)
+    if base.endswith(".mod"):
+        (base, ext) = (base[:-4], ".mod"+ext)
+    return "{0}.lod{1}{2}".format(base, level, ext)
+
+def export_sidecars(file, vertices, faces, config={}):
+    files = []
+    if config['export_meshlets']:
+        files.append(export_meshlets(sidecar_path(file, Sf3Meshlets), vertices[:, 0:3], faces, config))
+    if config['export_bounds']:
+        files.append(export_bounds(sidecar_path(file, Sf3Bounds), vertices[:, 0:3], faces, config))
+    return files
+
+def sidecar_mime(file):
+    for cls in SIDECARS:
+        if file.endswith(cls.EXTENSION):
+            return cls.MIME
+    return None
 
 def export_file(file, objects, config={}):
     if config['export_archive']:
@@ -93,7 +165,11 @@ def export_file(file, objects, config={}):
                 for i in range(1, len(subs)):
                     f = subs[i]
                     mime = "image/x.sf3"
-                    if os.path.splitext(f)[1] != "sf3":
+                    if f.endswith(".mod.sf3"):
+                        mime = "model/x.sf3"
+                    elif sidecar_mime(f):
+                        mime = sidecar_mime(f)
+                    elif os.path.splitext(f)[1] != "sf3":
                         mime = mimetypes.guess_file_type(f)
                     files.append({'file': f, 'path': os.path.relpath(f, dir), 'mime': mime})
             return export_archive(file, files, config)
@@ -142,108 +218,56 @@ def export_archive(file, files, config={}):
         archive._write(_io)
     return file
 
+# Sample formats SF3 images can be exported as, with the factor that maps
+# Blender's 0..1 floats onto the integer ones.
+SAMPLE_FORMATS = {
+    'UINT8': (Sf3Image.Formats.uint8, np.uint8, 255),
+    'UINT16': (Sf3Image.Formats.uint16, np.uint16, 65535),
+    'FLOAT16': (Sf3Image.Formats.float16, np.float16, None),
+    'FLOAT32': (Sf3Image.Formats.float32, np.float32, None),
+}
+
+CHANNEL_LAYOUTS = {
+    1: Sf3Image.Layouts.v,
+    2: Sf3Image.Layouts.va,
+    3: Sf3Image.Layouts.rgb,
+    4: Sf3Image.Layouts.rgba,
+}
+
 def export_image(file, img, config={}):
     print("Exporting image to "+file)
+    (width, height) = img.size
+    channels = img.channels
+    sample_format = config.get('image_sample_format', 'AUTO')
+    if sample_format == 'AUTO':
+        sample_format = 'FLOAT32' if img.is_float else 'UINT8'
+    (format, dtype, scale) = SAMPLE_FORMATS[sample_format]
+
+    # Blender hands out pixels as floats no matter how it stores them, so
+    # pull them all at once and convert in place.
+    pixels = np.empty(width * height * channels, dtype=np.float32)
+    img.pixels.foreach_get(pixels)
+    if scale is not None:
+        np.clip(pixels, 0.0, 1.0, out=pixels)
+        pixels *= scale
+        np.rint(pixels, out=pixels)
+    samples = pixels.astype(dtype)
+    del pixels
+    if format == Sf3Image.Formats.float16:
+        samples = samples.view(np.uint16)
+
     image = Sf3Image()
     image.magic = b"\x81\x53\x46\x33\x00\xE0\xD0\x0D\x0A\x0A"
     image.format_id = b"\x03"
     image.checksum = 0
     image.null_terminator = b"\x00"
     i = image.image = Sf3Image.Image(_parent=image, _root=image)
-    i.width = img.size[0]
-    i.heigh = img.size[1]
+    i.width = width
+    i.height = height
     i.depth = 1
-    i.format = Sf3Image.Formats.uint8
-
-    if(img.depth == 8):
-        i.channel_format = Sf3Image.Layouts.v
-    elif(img.depth == 16):
-        i.channel_format = Sf3Image.Layouts.va
-    elif(img.channels == 24):
-        i.channel_format = Sf3Image.Layouts.rgb
-    elif(img.channels == 32):
-        i.channel_format = Sf3Image.Layouts.rgba
-    elif(img.channels == 64):
-        i.channel_format = Sf3Image.Layouts.va
-        i.format = Sf3Image.Formats.float32
-    elif(img.channels == 96):
-        i.channel_format = Sf3Image.Layouts.rgb
-        i.format = Sf3Image.Formats.float32
-    elif(img.channels == 128):
-        i.channel_format = Sf3Image.Layouts.rgba
-        i.format = Sf3Image.Formats.float32
-
-    src = img.pixels
-    dst = []
-    conv = lambda x: x
-    if image.format & 32 == 32:
-        dst = [0.0] * (i.width * i.height * i.depth)
-    else:
-        dst = [0] * (i.width * i.height * i.depth)
-        conv = lambda x: round(x*255)
-
-    def from_1(i):
-        i = i*1
-        r = conv(src[i+0])
-        return (r,r,r,1.0)
-    def from_2(i):
-        i = i*2
-        r = conv(src[i+0])
-        a = conv(src[i+1])
-        return (r,r,r,a)
-    def from_3(i):
-        i = i*3
-        r = conv(src[i+0])
-        g = conv(src[i+1])
-        b = conv(src[i+2])
-        return (r,g,b,1.0)
-    def from_4(i):
-        i = i*4
-        r = conv(src[i+0])
-        g = conv(src[i+1])
-        b = conv(src[i+2])
-        a = conv(src[i+3])
-        return (r,g,b,a)
-
-    def to_1(i,r,g,b,a):
-        i = i*1
-        dst[i+0] = r
-    def to_2(i,r,g,b,a):
-        i = i*2
-        dst[i+0] = r
-        dst[i+1] = a
-    def to_3(i,r,g,b,a):
-        i = i*3
-        dst[i+0] = r
-        dst[i+1] = g
-        dst[i+2] = b
-    def to_4(i,r,g,b,a):
-        i = i*4
-        dst[i+0] = r
-        dst[i+1] = g
-        dst[i+2] = b
-        dst[i+3] = a
-
-    dst_enc = to_1
-    if img.channel_format & 0xF == 2:
-        dst_enc = to_2
-    if img.channel_format & 0xF == 3:
-        dst_enc = to_3
-    if img.channel_format & 0xF== 4:
-        dst_enc = to_4
-    src_dec = from_1
-    if img.channels == 2:
-        src_dec = from_2
-    if img.channels == 3:
-        src_dec = from_3
-    if img.channels == 4:
-        src_dec = from_4
-
-    for i in range(0, i.width * i.height):
-        (r,g,b,a) = src_dec(i)
-        dst_enc(i,r,g,b,a)
-
-    i.samples = dst
+    i.channel_format = CHANNEL_LAYOUTS[channels]
+    i.format = format
+    i.samples = samples
     image._check()
     f = open(file, 'wb')
     with KaitaiStream(f) as _io:
@@ -261,54 +285,66 @@ def export_model(file, obj, config={}):
     vertex_attributes = []
     textures = []
 
-    ## We first duplicate every vertex for every face.
-    indices = [0] * (len(mesh.loop_triangles)*3)
+    ## We first duplicate every vertex for every face. All attributes are
+    ## pulled out with foreach_get and gathered per corner with the loop
+    ## indices of the triangles.
+    indices = np.empty(len(mesh.loop_triangles)*3, dtype=np.int32)
     mesh.loop_triangles.foreach_get('loops', indices)
-    vertices = []
-    for i in indices:
-        vertex = mesh.vertices[mesh.loops[i].vertex_index].co
-        faces.append(len(vertices)//3)
-        vertices.append(vertex[0])
-        vertices.append(vertex[1])
-        vertices.append(vertex[2])
-    vertices = zup2yup(vertices)
-    vertex_attributes.append(vertices)
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_vertices)
+    corner_vertices = loop_vertices[indices]
+    vertex_attributes.append(zup2yup(foreach_array(mesh.vertices, 'co', 3)[corner_vertices]))
     lengths = [3]
-
-    def load_attribute(base, count):
-        attr = []
-        for i in indices:
-            vec = base[i].vector
-            for j in range(count):
-                attr.append(vec[j])
-        return attr
+    attribute_names = ['position']
 
     if 0 < len(mesh.uv_layers) and config['export_uvs']:
         vertex_type = vertex_type | 2
-        vertex_attributes.append(load_attribute(mesh.uv_layers[0].uv, 2))
+        vertex_attributes.append(foreach_array(mesh.uv_layers[0].uv, 'vector', 2)[indices])
         lengths.append(2)
+        attribute_names.append('uv')
     if 0 < len(mesh.color_attributes) and config['export_colors']:
         vertex_type = vertex_type | 4
-        vertex_attributes.append(load_attribute(mesh.color_attributes[0].data, 3))
+        colors = mesh.color_attributes[0]
+        rgba = foreach_array(colors.data, 'color', 4)
+        if colors.domain == 'POINT':
+            vertex_attributes.append(rgba[corner_vertices, 0:3])
+        else:
+            vertex_attributes.append(rgba[indices, 0:3])
         lengths.append(3)
+        attribute_names.append('color')
     if config['export_normals']:
         vertex_type = vertex_type | 8
-        vertex_attributes.append(zup2yup(load_attribute(mesh.corner_normals, 3)))
+        vertex_attributes.append(zup2yup(foreach_array(mesh.corner_normals, 'vector', 3)[indices]))
         lengths.append(3)
+        attribute_names.append('normal')
     if config['export_tangents']:
         mesh.calc_tangents()
         vertex_type = vertex_type | 16
-        tangents = []
-        for i in indices:
-            vec = mesh.loops[i].tangent
-            tangents.append(vec[0])
-            tangents.append(vec[1])
-            tangents.append(vec[2])
-        vertex_attributes.append(zup2yup(tangents))
+        vertex_attributes.append(zup2yup(foreach_array(mesh.loops, 'tangent', 3)[indices]))
         lengths.append(3)
+        attribute_names.append('tangent')
 
+    vertex_attributes = [attr.ravel() for attr in vertex_attributes]
     vertices = flatten_vertex_attributes(vertex_attributes, lengths)
-    (vertices, faces) = deduplicate_vertices(vertices, sum(lengths))
+    corner_count = len(vertices)
+    if config['weld_vertices']:
+        epsilons = [config['weld_'+name] for name in attribute_names]
+        keys = weld_keys(vertices, lengths, epsilons)
+        (vertices, faces) = deduplicate_vertices(vertices, sum(lengths), keys)
+        del keys
+        (vertices, faces) = remove_degenerate_faces(vertices, faces)
+    else:
+        (vertices, faces) = deduplicate_vertices(vertices, sum(lengths))
+    report(config, "{0}: {1} corners -> {2} vertices ({3:.1%}), {4} triangles".format(
+        obj.name, corner_count, len(vertices), len(vertices) / max(1, corner_count), len(faces) // 3))
+    if config['optimize_vertex_cache']:
+        cache_size = config['vertex_cache_size']
+        before = cache_statistics(faces, len(vertices), cache_size)
+        faces = optimize_vertex_cache(faces, len(vertices), cache_size)
+        (vertices, faces) = optimize_vertex_fetch(vertices, faces)
+        after = cache_statistics(faces, len(vertices), cache_size)
+        report(config, "{0}: ACMR {1:.3f} -> {2:.3f}, ATVR {3:.3f} -> {4:.3f}".format(
+            obj.name, before[0], after[0], before[1], after[1]))
 
     if 0 < len(obj.data.materials):
         def try_add(tex_node, name, bit):
@@ -346,6 +382,27 @@ def export_model(file, obj, config={}):
             try_add(node_input(bsdf, 'Specular Tint'), 'specular', 64)
         try_add(node_input(bsdf, 'Emission Color'), 'emissive', 128)
     
+    files = [ write_model(file, vertex_type, material_type, textures, vertices, faces) ]
+    files.extend(export_sidecars(file, vertices, faces, config))
+    ## Each level of detail is simplified from the previous one and shares
+    ## the vertex data of the full model, so only the vertices a level still
+    ## references are kept.
+    lod_faces = faces
+    for level in range(1, config['lod_levels']+1):
+        target = int(len(faces) // 3 * config['lod_ratio'] ** level)
+        lod_faces = simplify(vertices[:, 0:3], lod_faces, target)
+        lod_indices = lod_faces
+        if config['optimize_vertex_cache']:
+            lod_indices = optimize_vertex_cache(lod_indices, len(vertices), config['vertex_cache_size'])
+        (lod_vertices, lod_indices) = optimize_vertex_fetch(vertices, lod_indices)
+        path = lod_path(file, level)
+        report(config, "{0}: LOD {1}, {2} vertices, {3} triangles".format(
+            obj.name, level, len(lod_vertices), len(lod_indices) // 3))
+        files.append(write_model(path, vertex_type, material_type, textures, lod_vertices, lod_indices))
+        files.extend(export_sidecars(path, lod_vertices, lod_indices, config))
+    return [ *files, *textures ]
+
+def write_model(file, vertex_type, material_type, textures, vertices, faces):
     # Kaitai serialization is really.... really.... annoyingly cumbersome
     model = Sf3Model()
     model.magic = b"\x81\x53\x46\x33\x00\xE0\xD0\x0D\x0A\x0A"
@@ -363,13 +420,13 @@ def export_model(file, obj, config={}):
     mod.vertex_data = Sf3Model.VertexData(_parent=mod, _root=model)
     mod.vertex_data.face_count = len(faces)
     mod.vertex_data.faces = faces
-    mod.vertex_data.vertex_count = len(vertices)
-    mod.vertex_data.vertices = vertices
+    mod.vertex_data.vertex_count = vertices.size
+    mod.vertex_data.vertices = vertices.ravel()
     model._check()
     f = open(file, 'wb')
     with KaitaiStream(f) as _io:
         model._write(_io)
-    return [ file, *textures ]
+    return file
 
 class ExportSF3(Operator, ExportHelper):
     bl_idname = 'export_scene.sf3'
@@ -391,6 +448,16 @@ class ExportSF3(Operator, ExportHelper):
         description='Output format for images.',
         default='AUTO',
     )
+    image_sample_format: bpy.props.EnumProperty(
+        name='Image Samples',
+        items=(('AUTO', 'Automatic', 'Save 8 bit images as 8 bit and float images as 32 bit floats'),
+               ('UINT8', '8 Bit', 'Save samples as 8 bit unsigned integers'),
+               ('UINT16', '16 Bit', 'Save samples as 16 bit unsigned integers'),
+               ('FLOAT16', 'Half Float', 'Save samples as 16 bit floats'),
+               ('FLOAT32', 'Float', 'Save samples as 32 bit floats')),
+        description='Sample format of images saved as SF3 images',
+        default='AUTO',
+    )
     image_quality: bpy.props.IntProperty(
         name='Image Quality',
         description='The quality of the image for compressed formats',
@@ -429,6 +496,86 @@ class ExportSF3(Operator, ExportHelper):
         description='Whether to export tangent vectors',
         default=False,
     )
+    weld_vertices: bpy.props.BoolProperty(
+        name='Weld Vertices',
+        description='Whether to merge vertices whose attributes differ by less than the given tolerances, rather than only identical ones',
+        default=False,
+    )
+    weld_position: bpy.props.FloatProperty(
+        name='Position Tolerance',
+        description='Maximum difference in position for vertices to be welded',
+        default=0.0001, min=0.0, precision=6,
+    )
+    weld_uv: bpy.props.FloatProperty(
+        name='UV Tolerance',
+        description='Maximum difference in UV coordinates for vertices to be welded',
+        default=0.0001, min=0.0, precision=6,
+    )
+    weld_color: bpy.props.FloatProperty(
+        name='Color Tolerance',
+        description='Maximum difference in color for vertices to be welded',
+        default=0.002, min=0.0, precision=6,
+    )
+    weld_normal: bpy.props.FloatProperty(
+        name='Normal Tolerance',
+        description='Maximum difference in normal vectors for vertices to be welded',
+        default=0.001, min=0.0, precision=6,
+    )
+    weld_tangent: bpy.props.FloatProperty(
+        name='Tangent Tolerance',
+        description='Maximum difference in tangent vectors for vertices to be welded',
+        default=0.001, min=0.0, precision=6,
+    )
+    optimize_vertex_cache: bpy.props.BoolProperty(
+        name='Optimize Vertex Order',
+        description='Whether to reorder triangles and vertices for GPU vertex cache and fetch locality',
+        default=False,
+    )
+    vertex_cache_size: bpy.props.IntProperty(
+        name='Vertex Cache Size',
+        description='Number of vertices the targeted post-transform cache can hold',
+        default=16, min=3, max=128,
+    )
+    export_meshlets: bpy.props.BoolProperty(
+        name='Export Meshlets',
+        description='Whether to partition each model into meshlets with culling bounds, saved next to it as NAME.mod.meshlets',
+        default=False,
+    )
+    meshlet_vertices: bpy.props.IntProperty(
+        name='Meshlet Vertices',
+        description='Maximum number of vertices per meshlet',
+        default=64, min=3, max=256,
+    )
+    meshlet_triangles: bpy.props.IntProperty(
+        name='Meshlet Triangles',
+        description='Maximum number of triangles per meshlet',
+        default=124, min=1, max=512,
+    )
+    export_bounds: bpy.props.BoolProperty(
+        name='Export Bounds',
+        description='Whether to save the bounding box and sphere of each model next to it as NAME.mod.bounds',
+        default=False,
+    )
+    export_bvh: bpy.props.BoolProperty(
+        name='Include BVH',
+        description='Whether to also store a bounding volume hierarchy over the triangles with the bounds',
+        default=False,
+    )
+    bvh_leaf_size: bpy.props.IntProperty(
+        name='BVH Leaf Size',
+        description='Number of triangles below which a BVH node is not split further',
+        default=4, min=1, max=64,
+    )
+    lod_levels: bpy.props.IntProperty(
+        name='Detail Levels',
+        description='Number of simplified levels of detail to generate per object, saved next to the model as NAME.lodN.mod.sf3',
+        default=0, min=0, max=8,
+    )
+    lod_ratio: bpy.props.FloatProperty(
+        name='Level Ratio',
+        description='Fraction of the triangles of the previous level each level of detail should keep',
+        default=0.5, min=0.01, max=0.99, subtype='FACTOR',
+    )
 
     def draw(self, context):
         layout = self.layout
@@ -446,10 +593,44 @@ class ExportSF3(Operator, ExportHelper):
             body.prop(self, 'export_normals')
             body.prop(self, 'export_tangents')
             body.prop(self, 'export_colors')
+            body.prop(self, 'weld_vertices')
+            col = body.column()
+            col.enabled = self.weld_vertices
+            col.prop(self, 'weld_position')
+            col.prop(self, 'weld_uv')
+            col.prop(self, 'weld_color')
+            col.prop(self, 'weld_normal')
+            col.prop(self, 'weld_tangent')
+            body.prop(self, 'optimize_vertex_cache')
+            col = body.column()
+            col.enabled = self.optimize_vertex_cache
+            col.prop(self, 'vertex_cache_size')
+            body.prop(self, 'export_meshlets')
+            col = body.column()
+            col.enabled = self.export_meshlets
+            col.prop(self, 'meshlet_vertices')
+            col.prop(self, 'meshlet_triangles')
+            body.prop(self, 'export_bounds')
+            col = body.column()
+            col.enabled = self.export_bounds
+            col.prop(self, 'export_bvh')
+            row = col.row()
+            row.enabled = self.export_bvh
+            row.prop(self, 'bvh_leaf_size')
+        header, body = layout.panel('SF3_export_lod', default_closed=True)
+        header.label(text='Levels of Detail')
+        if body:
+            body.prop(self, 'lod_levels')
+            col = body.column()
+            col.enabled = 0 < self.lod_levels
+            col.prop(self, 'lod_ratio')
         header, body = layout.panel('SF3_export_material', default_closed=False)
         header.label(text='Material')
         if body:
             body.prop(self, 'image_type')
+            row = body.row()
+            row.enabled = self.image_type == 'SF3'
+            row.prop(self, 'image_sample_format')
             body.prop(self, 'image_quality')
 
     def invoke(self, context, event):
@@ -464,11 +645,29 @@ class ExportSF3(Operator, ExportHelper):
             'export_selection': self.export_selection,
             'export_archive': self.export_archive,
             'image_type': self.image_type,
+            'image_sample_format': self.image_sample_format,
             'image_quality': self.image_quality,
             'export_uvs': self.export_uvs,
             'export_colors': self.export_colors,
             'export_normals': self.export_normals,
             'export_tangents': self.export_tangents,
+            'weld_vertices': self.weld_vertices,
+            'weld_position': self.weld_position,
+            'weld_uv': self.weld_uv,
+            'weld_color': self.weld_color,
+            'weld_normal': self.weld_normal,
+            'weld_tangent': self.weld_tangent,
+            'optimize_vertex_cache': self.optimize_vertex_cache,
+            'vertex_cache_size': self.vertex_cache_size,
+            'export_meshlets': self.export_meshlets,
+            'meshlet_vertices': self.meshlet_vertices,
+            'meshlet_triangles': self.meshlet_triangles,
+            'export_bounds': self.export_bounds,
+            'export_bvh': self.export_bvh,
+            'bvh_leaf_size': self.bvh_leaf_size,
+            'lod_levels': self.lod_levels,
+            'lod_ratio': self.lod_ratio,
+            'report': self.report,
         }
         objects = []
         if self.export_selection == 'ACTIVE':
@@ -1,7 +1,12 @@
 import bpy
 import os
-import tempfile
+import hashlib
+import posixpath
+import queue
+import threading
+import time
 import traceback
+import numpy as np
 from pathlib import Path
 from bpy.types import Operator
 from bpy_extras.io_utils import ImportHelper
@@ -9,6 +14,17 @@ from .sf3.sf3_model import Sf3Model
 from .sf3.sf3_archive import Sf3Archive
 from .sf3.sf3_image import Sf3Image
 from .sf3 import kaitaistruct
+from .sf3 import formats
+from .sf3 import archive_index
+from .sf3 import pool
+from .sf3.image_reader import ImageReader
+
+# Maps SF3 parser classes to the functions that import them. Each is called
+# as function(file, config, source=source, buffer=buffer).
+importers = {}
+
+def register_importer(cls, function):
+    importers[cls] = function
 
 def message_box(message="", title="SF3", icon='INFO'):
     def draw(self, context):
@@ -17,10 +33,7 @@ def message_box(message="", title="SF3", icon='INFO'):
     bpy.context.window_manager.popup_menu(draw, title=title, icon=icon)
 
 def path_index(path, archive):
-    for i in range(0, len(archive.meta_entries)):
-        if path == archive.meta_entries[i].path.value:
-            return i
-    return None
+    return archive_index.find(archive, path)
 
 def archive_file(file, archive):
     i = file
@@ -37,18 +50,16 @@ def import_file(file, config={}, source=None):
         print("Importing file "+file)
         if not os.path.isfile(file):
             raise Exception("File does not exist: "+file)
+        # The mapping is both used to sniff the header and to parse the
+        # file, so it only gets opened once.
+        buffer = kaitaistruct.mmap_file(file)
         try:
-            return import_archive(file, config)
-        except kaitaistruct.ValidationNotEqualError:
-            pass
-        try:
-            return import_model(file, config)
-        except kaitaistruct.ValidationNotEqualError:
-            pass
-        try:
-            return import_image(file, config)
-        except kaitaistruct.ValidationNotEqualError:
-            pass
+            if formats.format_id(buffer) is not None:
+                return import_sf3(buffer, file, config)
+        finally:
+            # Views that outlive the import, such as the ones kept by a
+            # MeshCache, hold the mapping open until they go.
+            kaitaistruct.close_buffer(buffer)
         try:
             return bpy.data.images.load(file, check_existing=True)
         except Exception:
@@ -56,170 +67,296 @@ def import_file(file, config={}, source=None):
         raise Exception("Failed to import, does not appear to be a valid file: "+file)
     elif isinstance(source, Sf3Archive.Archive):
         (octs, type, file) = archive_file(file, source)
-        # We can't load images from octets, so write them to disk... yay.
-        # Also this simplifies the parsing logic since everything goes
-        # through files.
-        with tempfile.TemporaryDirectory() as dir:
-            path = os.path.join(dir,file)
-            with open(path, 'w+b') as fp:
-                fp.write(octs)
-            return import_file(path, config)
+        return import_buffer(octs, file, config, source)
     else:
         raise Exception("Unknown source type: "+type(source))
 
-def import_image(file, config={}):
-    image = Sf3Image.from_file(file).image
+def import_sf3(buffer, file, config={}, source=None):
+    cls = formats.format_class(buffer)
+    importer = importers.get(cls)
+    if importer is None:
+        raise Exception("Unsupported SF3 format {0}: {1}".format(formats.format_id(buffer), file))
+    return importer(file, config, source=source, buffer=buffer)
+
+def import_buffer(octs, file, config={}, source=None):
+    # Nested SF3 files are parsed straight from the (mapped) payload.
+    if formats.format_id(octs) is not None:
+        return import_sf3(octs, file, config, source)
+    try:
+        return load_image_buffer(octs, file)
+    except Exception:
+        print(traceback.format_exc())
+    raise Exception("Failed to import, does not appear to be a valid file: "+file)
+
+def load_image_buffer(octs, file):
+    # Blender can decode PNG, JPEG etc. from packed data, so there is no
+    # need to stage the file on disk. Packing never fails though, bad data
+    # only shows once the image is loaded, which asking for its size does.
+    name = os.path.basename(file)
+    img = bpy.data.images.new(name, 8, 8)
+    img.pack(data=bytes(octs), data_len=len(octs))
+    img.source = 'FILE'
+    if img.size[0] != 0 and img.has_data:
+        return img
+    bpy.data.images.remove(img)
+    raise Exception("Failed to decode image: "+file)
+
+def zup(vectors):
+    # SF3 is Y-up, Blender is Z-up.
+    out = vectors[:, (0, 2, 1)]
+    out[:, 2] *= -1
+    return out
+
+def parse_file(cls, file, buffer=None):
+    if buffer is None:
+        return cls.from_mmap(file)
+    return cls.from_buffer(buffer)
+
+def texture_path(dir, texname, source=None):
+    if isinstance(source, Sf3Archive.Archive):
+        path = posixpath.normpath(posixpath.join(dir, texname))
+        if path_index(path, source) is None and path_index(texname, source) is not None:
+            return texname
+        return path
+    return os.path.join(dir, texname)
+
+# Divisors that map the samples of each format onto 0..1, or -1..1 for the
+# signed ones.
+SAMPLE_SCALES = {
+    Sf3Image.Formats.int8: 127,
+    Sf3Image.Formats.int16: 32767,
+    Sf3Image.Formats.int32: 2147483647,
+    Sf3Image.Formats.int64: 9223372036854775807,
+    Sf3Image.Formats.uint8: 255,
+    Sf3Image.Formats.uint16: 65535,
+    Sf3Image.Formats.uint32: 4294967295,
+    Sf3Image.Formats.uint64: 18446744073709551615,
+    Sf3Image.Formats.float16: 1,
+    Sf3Image.Formats.float32: 1,
+    Sf3Image.Formats.float64: 1,
+}
+
+def decode_samples(samples, format):
+    # Normalises a sample array of the given format to float32.
+    scale = SAMPLE_SCALES.get(format)
+    if scale is None:
+        raise Exception("Unsupported image pixel format: {0}".format(format))
+    if scale == 1:
+        return samples.astype(np.float32)
+    if 2 < samples.itemsize:
+        # Too wide for the mantissa of a float32
+        samples = samples.astype(np.float64)
+    return np.multiply(samples, 1.0 / scale, dtype=np.float32)
+
+# The source channels of red, green and blue in every layout, and that of
+# alpha, or None if the layout has no alpha.
+LAYOUT_CHANNELS = {
+    Sf3Image.Layouts.v: ((0, 0, 0), None),
+    Sf3Image.Layouts.va: ((0, 0, 0), 1),
+    Sf3Image.Layouts.rgb: ((0, 1, 2), None),
+    Sf3Image.Layouts.rgba: ((0, 1, 2), 3),
+    Sf3Image.Layouts.av: ((1, 1, 1), 0),
+    Sf3Image.Layouts.bgr: ((2, 1, 0), None),
+    Sf3Image.Layouts.abgr: ((3, 2, 1), 0),
+    Sf3Image.Layouts.argb: ((1, 2, 3), 0),
+    Sf3Image.Layouts.bgra: ((2, 1, 0), 3),
+}
+
+# The source channels of cyan, magenta, yellow and black in the ink layouts.
+INK_CHANNELS = {
+    Sf3Image.Layouts.cmyk: (0, 1, 2, 3),
+    Sf3Image.Layouts.kmyc: (3, 1, 2, 0),
+}
+
+def layout_has_alpha(layout):
+    return LAYOUT_CHANNELS.get(layout, (None, None))[1] is not None
+
+def swizzle_rgba(pixels, layout):
+    # Gathers the channels of any layout into Blender's RGBA floats, in one
+    # indexing operation over the whole array.
+    rgba = np.ones(pixels.shape[:-1] + (4,), dtype=np.float32)
+    if layout in INK_CHANNELS:
+        inks = pixels[..., INK_CHANNELS[layout]]
+        np.multiply(1.0 - inks[..., 0:3], 1.0 - inks[..., 3:4], out=rgba[..., 0:3])
+    elif layout in LAYOUT_CHANNELS:
+        (rgb, alpha) = LAYOUT_CHANNELS[layout]
+        if alpha is None:
+            rgba[..., 0:3] = pixels[..., rgb]
+        else:
+            rgba[...] = pixels[..., rgb + (alpha,)]
+    else:
+        raise Exception("Unsupported image channel layout: {0}".format(layout))
+    return rgba
+
+def slice_name(file, z, depth):
+    # Slices are numbered like the frames of an image sequence.
+    name = os.path.basename(file)
+    if depth <= 1:
+        return name
+    (root, ext) = os.path.splitext(name)
+    return "{0}.{1:04d}{2}".format(root, z, ext)
+
+def import_image(file, config={}, source=None, buffer=None):
+    if buffer is None:
+        buffer = kaitaistruct.mmap_file(file)
+    image = ImageReader(buffer)
     print("Importing image "+file)
 
-    if image.channel_format in [68, 84]:
-        raise Exception("Unsupported image channel layout: "+image.channel_format)
-    if image.format in [34]:
-        raise Exception("Unsupported image pixel format: "+image.format)
-    if 1 < image.depth:
-        raise Exception("Images with depth are not supported.")
+    # Volumes and layered images become one image per depth slice. The
+    # samples are read straight from the buffer a band of rows at a time,
+    # so the only full size allocation is the float RGBA pixels of the
+    # slice currently handed to Blender.
+    if image.depth < 1:
+        raise Exception("Image has no depth slices: "+file)
+    images = []
+    for z in range(image.depth):
+        pixels = np.empty((image.height, image.width, 4), dtype=np.float32)
+        for (y, band) in image.bands(z=z):
+            pixels[y:y+len(band)] = swizzle_rgba(decode_samples(band, image.format), image.channel_format)
+        img = bpy.data.images.new(slice_name(file, z, image.depth), image.width, image.height,
+                                  alpha=layout_has_alpha(image.channel_format),
+                                  float_buffer=(image.format & 32 == 32))
+        img.pixels.foreach_set(pixels.ravel())
+        del pixels
+        if 1 < image.depth:
+            img['sf3_slice'] = z
+            img['sf3_depth'] = image.depth
+        img.update()
+        images.append(img)
+    # Textures refer to the first slice.
+    return images[0]
 
-    img = bpy.data.images.new(os.path.basename(file), image.width, image.height,
-                              alpha=(image.channel_format & 4 == 4 or image.channel_format & 2 == 2),
-                              float_buffer=(image.format & 32 == 32))
-    
-    scalar = 1
-    if image.format & 1 == 1:
-        scalar = 127
-    elif image.format & 2 == 2:
-        scalar = 32767
-    elif image.format & 4 == 4:
-        scalar = 2147483647
-    elif image.format & 8 == 8:
-        scalar = 9223372036854775807
-    if image.format & 16 == 16:
-        scalar = (scalar+1) * 2 - 1
-    elif image.format & 32 == 32:
-        scalar = 1
-
-    src = image.samples
-    dst = [0.0] * (img.size[0] * img.size[0] * img.channels)
-
-    def from_1(i):
-        i = i*1
-        r = src[i+0] / scalar
-        return (r,r,r,1.0)
-    def from_2(i):
-        i = i*2
-        r = src[i+0] / scalar
-        a = src[i+1] / scalar
-        return (r,r,r,a)
-    def from_3(i):
-        i = i*3
-        r = src[i+0] / scalar
-        g = src[i+1] / scalar
-        b = src[i+2] / scalar
-        return (r,g,b,1.0)
-    def from_4(i):
-        i = i*4
-        r = src[i+0] / scalar
-        g = src[i+1] / scalar
-        b = src[i+2] / scalar
-        a = src[i+3] / scalar
-        return (r,g,b,a)
-
-    def to_1(i,r,g,b,a):
-        i = i*1
-        dst[i+0] = r
-    def to_2(i,r,g,b,a):
-        i = i*2
-        dst[i+0] = r
-        dst[i+1] = a
-    def to_3(i,r,g,b,a):
-        i = i*3
-        dst[i+0] = r
-        dst[i+1] = g
-        dst[i+2] = b
-    def to_4(i,r,g,b,a):
-        i = i*4
-        dst[i+0] = r
-        dst[i+1] = g
-        dst[i+2] = b
-        dst[i+3] = a
-
-    dst_enc = to_1
-    if img.channels == 2:
-        dst_enc = to_2
-    if img.channels == 3:
-        dst_enc = to_3
-    if img.channels == 4:
-        dst_enc = to_4
-    src_dec = from_1
-    if image.channel_format & 0xF == 2:
-        src_dec = from_2
-    if image.channel_format & 0xF == 3:
-        src_dec = from_3
-    if image.channel_format & 0xF == 4:
-        src_dec = from_4
-
-    for i in range(0, image.width * image.height):
-        (r,g,b,a) = src_dec(i)
-        dst_enc(i,r,g,b,a)
-
-    img.pixels = dst
-    img.update()
-    return img
-
-def import_archive(file, config={}):
-    archive = Sf3Archive.from_file(file).archive
+def iter_archive(file, config={}, source=None, buffer=None):
+    # Imports the models of an archive one at a time, yielding each along
+    # with the size of its entry, so that callers can spread the work out.
+    archive = parse_file(Sf3Archive, file, buffer).archive
     print("Importing archive "+file)
-    models = []
-    for i in range(0, len(archive.meta_entries)):
-        mime = archive.meta_entries[i].mime.value
-        file = archive.meta_entries[i].path.value
-        print("{0}: {1} {2}".format(i, file, mime))
-        if mime == "model/x.sf3":
-            models.append(import_file(i, config, archive))
-    return models
-
-def import_model(file, config={}, name=None, source=None):
+    # Models preloaded from this archive are keyed by their entry path.
+    config = dict(config, preloaded=config.get('preloaded', {}).get(file) or {})
+    for i in archive_index.by_mime(archive, "model/x.sf3"):
+        print("{0}: {1}".format(i, archive.meta_entries[i].path.value))
+        # The size comes from the offsets, as indexing file_payloads again
+        # would parse the payload a second time.
+        (start, end) = archive.file_payloads.span(i)
+        yield (import_file(i, config, archive), end - start - 8)
+
+def import_archive(file, config={}, source=None, buffer=None):
+    return [model for (model, size) in iter_archive(file, config, source, buffer)]
+
+def iter_file(file, config={}):
+    # Like import_file, but yields (result, bytes) after every model of an
+    # archive rather than importing it all at once.
+    if not os.path.isfile(file):
+        raise Exception("File does not exist: "+file)
+    buffer = kaitaistruct.mmap_file(file)
+    try:
+        archive = formats.format_class(buffer) is Sf3Archive
+        if archive:
+            yield from iter_archive(file, config, buffer=buffer)
+    finally:
+        kaitaistruct.close_buffer(buffer)
+    if not archive:
+        yield (import_file(file, config), os.path.getsize(file))
+
+def content_checksum(file, buffer, source=None):
+    # The CRC32 an archive stores for each entry, or the one in the SF3
+    # header otherwise. Either only serves as a first filter.
+    if isinstance(source, Sf3Archive.Archive):
+        i = path_index(file, source)
+        if i is not None:
+            return source.meta_entries[i].checksum
+    return kaitaistruct.KaitaiStream.packer_u4le.unpack(bytes(buffer[11:15]))[0]
+
+def content_digest(buffer):
+    with memoryview(buffer) as view:
+        return hashlib.blake2b(view[formats.HEADER_SIZE:]).digest()
+
+class MeshCache:
+    # Meshes imported so far by their content, so that copies of the same
+    # model end up as linked duplicates of one mesh. Entries are filtered
+    # by checksum and size first, and only hashed in full on a match.
+    def __init__(self):
+        self.entries = {}
+        self.duplicates = 0
+
+    def find(self, key, buffer):
+        candidates = self.entries.get(key)
+        if not candidates:
+            return None
+        digest = content_digest(buffer)
+        for entry in candidates:
+            (other, other_digest, source, mesh) = entry
+            if other_digest is None:
+                other_digest = entry[1] = content_digest(other)
+            if other_digest != digest:
+                continue
+            try:
+                mesh.name
+            except ReferenceError:
+                # Deleted since, by a rollback or the user.
+                continue
+            self.duplicates += 1
+            return mesh
+        return None
+
+    def add(self, key, buffer, source, mesh):
+        # The source is kept alive along with the entry, as its id is part
+        # of the key.
+        # The buffer is held as a view, which keeps a mapping around for
+        # hashing after import_file has closed it.
+        self.entries.setdefault(key, []).append([memoryview(buffer), None, source, mesh])
+
+def import_model(file, config={}, name=None, source=None, buffer=None):
     dir = os.path.dirname(file)
     if name is None:
         name = Path(file).stem
-    mod = Sf3Model.from_file(file).model
+    mod = config.get('preloaded', {}).get(file)
+    if mod is None:
+        mod = parse_file(Sf3Model, file, buffer).model
     print("Importing model "+file)
+
+    # Textures resolve relative to the model, so identical data only makes
+    # for an identical mesh if the textures do too.
+    cache = config.get('mesh_cache')
+    key = None
+    if cache is not None and buffer is not None:
+        textures = tuple(texture_path(dir, tex.value, source) for tex in mod.material.textures)
+        key = (content_checksum(file, buffer, source), len(buffer), id(source), textures)
+        mesh = cache.find(key, buffer)
+        if mesh is not None:
+            print("Sharing mesh "+mesh.name)
+            obj = bpy.data.objects.new(name, mesh)
+            bpy.data.collections["Collection"].objects.link(obj)
+            bpy.context.view_layer.objects.active = obj
+            return obj
+
     mesh = bpy.data.meshes.new(name)
     obj = bpy.data.objects.new(name, mesh)
     bpy.data.collections["Collection"].objects.link(obj)
     bpy.context.view_layer.objects.active = obj
 
-    dat = mod.vertex_data
-    stride = mod.format.vertex_stride
-    vert_range = range(0, len(dat.vertices), stride)
-    verts = [[dat.vertices[i+0],dat.vertices[i+2],-dat.vertices[i+1]] for i in vert_range]
-    faces = [dat.faces[i:i+3] for i in range(0, len(dat.faces), 3)]
-    mesh.from_pydata(verts, [], faces)
+    # Everything below works on whole arrays viewed straight over the parsed
+    # buffers and goes into Blender through foreach_set.
+    faces = mod.face_array().astype(np.int32).ravel()
+    positions = mod.attribute('position')
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set('co', zup(positions).ravel())
+    mesh.loops.add(len(faces))
+    mesh.loops.foreach_set('vertex_index', faces)
+    mesh.polygons.add(len(faces) // 3)
+    mesh.polygons.foreach_set('loop_start', np.arange(0, len(faces), 3, dtype=np.int32))
+    mesh.update(calc_edges=True)
 
-    offset = 3
     if mod.format.has_uv:
-        uvs = []
-        for f in faces:
-            for i in f:
-                uvs.append(dat.vertices[i*stride+offset+0])
-                uvs.append(dat.vertices[i*stride+offset+1])
         layer = mesh.uv_layers.new(name='UVMap')
-        layer.uv.foreach_set('vector', uvs)
-        offset += 2
+        layer.uv.foreach_set('vector', mod.attribute('uv')[faces].ravel())
     if mod.format.has_color:
-        colors = []
-        for f in faces:
-            for i in f:
-                colors.append(dat.vertices[i*stride+offset+0])
-                colors.append(dat.vertices[i*stride+offset+1])
-                colors.append(dat.vertices[i*stride+offset+2])
+        colors = np.ones((len(faces), 4), dtype=np.float32)
+        colors[:, 0:3] = mod.attribute('color')[faces]
         layer = mesh.color_attributes.new('Color', 'BYTE_COLOR', 'CORNER')
-        layer.data.foreach_set('color', colors)
-        offset += 3
+        layer.data.foreach_set('color', colors.ravel())
     if mod.format.has_normal:
-        normals = [[dat.vertices[i+offset+0],dat.vertices[i+offset+2],-dat.vertices[i+offset+1]] for i in vert_range]
-        mesh.normals_split_custom_set_from_vertices(normals)
-        offset += 3
-    if mod.format.has_tangent:
-        offset += 3
+        mesh.normals_split_custom_set_from_vertices(zup(mod.attribute('normal')))
 
     if 0 < len(mod.material.textures):
         mat = bpy.data.materials.new(name=name)
@@ -231,7 +368,7 @@ def import_model(file, config={}, name=None, source=None):
 
         offset = 0
         def load_texture(texname):
-            texpath = os.path.join(dir, mod.material.textures[offset].value)
+            texpath = texture_path(dir, mod.material.textures[offset].value, source)
             img = None
             try:
                 img = import_file(texpath, config, source)
@@ -285,8 +422,71 @@ def import_model(file, config={}, name=None, source=None):
             tex = load_texture('emission')
             mat.node_tree.links.new(bsdf.inputs['Emission Color'], tex.outputs['Color'])
             offset += 1
+    if key is not None:
+        cache.add(key, buffer, source, mesh)
     return obj
 
+register_importer(Sf3Archive, import_archive)
+register_importer(Sf3Image, import_image)
+register_importer(Sf3Model, import_model)
+
+# Data blocks an import can create, which are removed again when a modal
+# import gets cancelled.
+ROLLBACK_DATA = ('objects', 'meshes', 'materials', 'images')
+
+def data_snapshot():
+    return set(id.as_pointer() for name in ROLLBACK_DATA for id in getattr(bpy.data, name))
+
+def created_since(snapshot):
+    return data_snapshot() - snapshot
+
+def rollback(created):
+    ids = [id for name in ROLLBACK_DATA for id in getattr(bpy.data, name)
+           if id.as_pointer() in created]
+    bpy.data.batch_remove(ids)
+    return len(ids)
+
+def parse_files(paths, workers, results, cancelled, done):
+    # Body of the background thread of a modal import. It must not touch
+    # bpy, everything it parses is handed over through the results queue.
+    if 1 < len(paths) and workers != 1:
+        parsed = pool.preload(paths, workers)
+    else:
+        def parse_locally():
+            for path in paths:
+                try:
+                    yield (path, pool.parse(path))
+                except Exception as e:
+                    yield (path, e)
+        parsed = parse_locally()
+    try:
+        for (path, result) in parsed:
+            while not cancelled.is_set():
+                try:
+                    results.put((path, result), timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            else:
+                if isinstance(result, pool.Preloaded):
+                    result.close()
+                break
+    finally:
+        parsed.close()
+        if cancelled.is_set():
+            # Nobody picks these up any more.
+            release_results(results)
+        done.set()
+
+def release_results(results):
+    while True:
+        try:
+            (path, result) = results.get_nowait()
+        except queue.Empty:
+            return
+        if isinstance(result, pool.Preloaded):
+            result.close()
+
 class ImportSF3(Operator, ImportHelper):
     bl_idname = 'import_scene.sf3'
     bl_label = 'Import SF3'
@@ -299,30 +499,244 @@ class ImportSF3(Operator, ImportHelper):
         type=bpy.types.OperatorFileListElement,
     )
 
+    workers: bpy.props.IntProperty(
+        name='Worker Processes',
+        description='Processes that parse files in parallel when several are imported at once. 0 uses one per CPU, 1 parses everything in Blender itself',
+        default=0,
+        min=0,
+        max=64,
+    )
+
+    background: bpy.props.BoolProperty(
+        name='Import in Background',
+        description='Parse files in the background and add them bit by bit while Blender stays responsive. Press Esc to cancel and undo the import',
+        default=True,
+    )
+
+    share_meshes: bpy.props.BoolProperty(
+        name='Share Duplicate Meshes',
+        description='Import models with identical content as linked duplicates of one mesh',
+        default=True,
+    )
+
     def draw(self, context):
         layout = self.layout
 
         layout.use_property_split = True
         layout.use_property_decorate = False  # No animation.
 
+        layout.prop(self, 'share_meshes')
+        layout.prop(self, 'background')
+        layout.prop(self, 'workers')
+
     def invoke(self, context, event):
+        self.interactive = True
         return ImportHelper.invoke_popup(self, context)
 
     def execute(self, context):
+        # Scripts get the blocking import, the UI the modal one.
+        if self.background and getattr(self, 'interactive', False) and context.window is not None:
+            return self.start_modal(context)
         return self.import_sf3(context)
 
-    def import_sf3(self, context):
-        import_settings = {}
+    def file_paths(self):
         if self.files:
-            ret = {'CANCELLED'}
             dirname = os.path.dirname(self.filepath)
-            for file in self.files:
-                path = os.path.join(dirname, file.name)
-                import_file(path, import_settings)
-                ret = {'FINISHED'}
-            return ret
+            return [os.path.join(dirname, file.name) for file in self.files]
+        return [self.filepath]
+
+    def start_modal(self, context):
+        self.paths = self.file_paths()
+        self.config = self.import_settings()
+        # Only what appears while committing is ours, the user is free to
+        # keep working in between.
+        self.created = set()
+        self.total_bytes = sum(os.path.getsize(path) for path in self.paths if os.path.isfile(path))
+        self.done_bytes = 0
+        self.file_bytes = 0
+        self.entries = 0
+        self.failed = 0
+        self.current = None
+        self.started = time.perf_counter()
+        self.results = queue.Queue(maxsize=4)
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=parse_files, daemon=True,
+                                       args=(self.paths, self.workers, self.results, self.cancelled, self.done))
+        self.thread.start()
+        wm = context.window_manager
+        wm.progress_begin(0, max(self.total_bytes, 1))
+        self.timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        self.update_status(context)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self.cancel_modal(context)
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        snapshot = data_snapshot()
+        status = None
+        try:
+            status = self.commit_batch(context)
+        finally:
+            self.created |= created_since(snapshot)
+            if status is None:
+                # Something went wrong outside of a single file, which
+                # leaves the import in an unknown state.
+                self.cancel_modal(context)
+        return status
+
+    def commit_batch(self, context):
+        # Commit for at most a frame's worth of time, then let Blender redraw.
+        deadline = time.perf_counter() + 0.04
+        while time.perf_counter() < deadline:
+            if self.current is None:
+                try:
+                    (path, result) = self.results.get_nowait()
+                except queue.Empty:
+                    if self.done.is_set() and self.results.empty():
+                        return self.finish_modal(context)
+                    break
+                self.begin_file(path, result)
+                continue
+            (path, result, entries) = self.current
+            try:
+                (_, size) = next(entries)
+                self.entries += 1
+                self.file_bytes += size
+            except StopIteration:
+                self.end_file()
+            except Exception as e:
+                print(traceback.format_exc())
+                self.report({'ERROR'}, "Failed to import {0}: {1}".format(path, e))
+                self.failed += 1
+                self.end_file()
+        self.update_status(context)
+        return {'RUNNING_MODAL'}
+
+    def begin_file(self, path, result):
+        if isinstance(result, Exception):
+            print("".join(traceback.format_exception(type(result), result, result.__traceback__)))
+            self.report({'ERROR'}, "Failed to import {0}: {1}".format(path, result))
+            self.failed += 1
+            self.done_bytes += os.path.getsize(path) if os.path.isfile(path) else 0
+            return
+        models = result.models if isinstance(result, pool.Preloaded) else result
+        config = dict(self.config, preloaded={path: models})
+        self.current = (path, result, iter_file(path, config))
+
+    def end_file(self):
+        (path, result, entries) = self.current
+        self.current = None
+        entries.close()
+        if isinstance(result, pool.Preloaded):
+            result.close()
+        self.done_bytes += os.path.getsize(path)
+        self.file_bytes = 0
+
+    def update_status(self, context):
+        done = self.done_bytes + self.file_bytes
+        elapsed = max(time.perf_counter() - self.started, 1e-6)
+        context.window_manager.progress_update(done)
+        context.workspace.status_text_set(
+            "Importing SF3: {0} entries, {1:.1f} of {2:.1f} MB, {3:.1f} MB/s (Esc to cancel)".format(
+                self.entries, done / 1e6, self.total_bytes / 1e6, done / 1e6 / elapsed))
+
+    def stop_modal(self, context):
+        # Never waits on the thread. It notices the flag on its own and
+        # releases whatever it still parses, this only drains what is
+        # already queued.
+        self.cancelled.set()
+        release_results(self.results)
+        if self.timer is not None:
+            context.window_manager.event_timer_remove(self.timer)
+            self.timer = None
+            context.window_manager.progress_end()
+            if context.workspace is not None:
+                context.workspace.status_text_set(None)
+
+    def import_settings(self):
+        config = {}
+        if self.share_meshes:
+            config['mesh_cache'] = MeshCache()
+        return config
+
+    def report_duplicates(self, config):
+        cache = config.get('mesh_cache')
+        if cache is not None and 0 < cache.duplicates:
+            self.report({'INFO'}, "Collapsed {0} duplicate models into shared meshes".format(cache.duplicates))
+
+    def finish_modal(self, context):
+        self.stop_modal(context)
+        count = len(self.paths)
+        if self.failed == count:
+            return {'CANCELLED'}
+        if 0 < self.failed:
+            self.report({'WARNING'}, "{0} of {1} files failed to import".format(self.failed, count))
+        self.report_duplicates(self.config)
+        self.report({'INFO'}, "Imported {0} entries from {1} files in {2:.1f}s".format(
+            self.entries, count - self.failed, time.perf_counter() - self.started))
+        return {'FINISHED'}
+
+    def cancel_modal(self, context):
+        # Finish the file being committed off first so that nothing refers
+        # to its data any more, then remove everything that was created.
+        if self.current is not None:
+            (path, result, entries) = self.current
+            self.current = None
+            entries.close()
+            if isinstance(result, pool.Preloaded):
+                result.close()
+        self.stop_modal(context)
+        removed = rollback(self.created)
+        self.report({'WARNING'}, "Import cancelled, removed {0} data blocks".format(removed))
+        return {'CANCELLED'}
+
+    def cancel(self, context):
+        # Blender calls this when the modal import is interrupted, for
+        # example by closing the window or loading another file.
+        self.cancel_modal(context)
+
+    def import_one(self, path, config, preloaded=None):
+        # Parsing may have happened in a worker already, but everything that
+        # touches bpy happens here on the main thread.
+        if preloaded is not None:
+            config = dict(config, preloaded={path: preloaded.models})
+        try:
+            import_file(path, config)
+            return True
+        except Exception as e:
+            print(traceback.format_exc())
+            self.report({'ERROR'}, "Failed to import {0}: {1}".format(path, e))
+            return False
+
+    def import_sf3(self, context):
+        import_settings = self.import_settings()
+        paths = self.file_paths()
+        if 1 < len(paths) and self.workers != 1:
+            results = pool.preload(paths, self.workers)
         else:
-            return import_file(self.filepath, import_settings)
+            results = ((path, None) for path in paths)
+        failed = 0
+        for (path, preloaded) in results:
+            if isinstance(preloaded, Exception):
+                print("".join(traceback.format_exception(type(preloaded), preloaded, preloaded.__traceback__)))
+                self.report({'ERROR'}, "Failed to import {0}: {1}".format(path, preloaded))
+                failed += 1
+                continue
+            try:
+                if not self.import_one(path, import_settings, preloaded):
+                    failed += 1
+            finally:
+                if preloaded is not None:
+                    preloaded.close()
+        if failed == len(paths):
+            return {'CANCELLED'}
+        if 0 < failed:
+            self.report({'WARNING'}, "{0} of {1} files failed to import".format(failed, len(paths)))
+        self.report_duplicates(import_settings)
         return {'FINISHED'}
 
 def menu_func_import(self, context):
@@ -0,0 +1,109 @@
+import numpy as np
+from .sf3.sf3_meshlets import Sf3Meshlets
+from .sf3.kaitaistruct import KaitaiStream
+
+## Splits an index buffer into meshlets for GPU driven culling. Triangles
+## are sorted along a Morton curve through their centroids, which keeps
+## neighbouring triangles together, and then packed greedily in that order
+## until either limit is hit. Sorting dominates, so this is O(n log n).
+
+def morton_codes(points):
+    ## 30 bit Morton codes of the points in their bounding box.
+    low = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - low, 1e-30)
+    cells = np.minimum((points - low) / extent * 1024, 1023).astype(np.uint64)
+    codes = np.zeros(len(points), dtype=np.uint64)
+    for axis in range(3):
+        x = cells[:,axis]
+        x = (x | (x << np.uint64(16))) & np.uint64(0x030000FF)
+        x = (x | (x << np.uint64(8))) & np.uint64(0x0300F00F)
+        x = (x | (x << np.uint64(4))) & np.uint64(0x030C30C3)
+        x = (x | (x << np.uint64(2))) & np.uint64(0x09249249)
+        codes |= x << np.uint64(axis)
+    return codes
+
+def partition(faces, max_vertices, max_triangles, order):
+    ## Packs the triangles in the given order. Returns the (N,4) meshlet
+    ## table, the global vertex indices, the local triangle indices and the
+    ## triangle IDs in the order they were packed.
+    tris = faces.reshape(-1, 3)[order].tolist()
+    meshlets = []
+    vertices = []
+    local = []
+    start_vertex = 0
+    start_triangle = 0
+    slots = {}
+    for tri in tris:
+        new = 3 - sum(1 for v in tri if v in slots)
+        if max_vertices < len(slots) + new or max_triangles <= len(local) // 3 - start_triangle:
+            meshlets.append((start_vertex, len(slots), start_triangle, len(local) // 3 - start_triangle))
+            start_vertex = len(vertices)
+            start_triangle = len(local) // 3
+            slots = {}
+        for v in tri:
+            slot = slots.get(v)
+            if slot is None:
+                slot = slots[v] = len(slots)
+                vertices.append(v)
+            local.append(slot)
+    if slots:
+        meshlets.append((start_vertex, len(slots), start_triangle, len(local) // 3 - start_triangle))
+    return (np.array(meshlets, dtype=np.uint32).reshape(-1, 4),
+            np.array(vertices, dtype=np.uint32),
+            np.array(local, dtype=np.uint8))
+
+def meshlet_bounds(positions, faces, meshlets, vertices, order):
+    ## Bounding sphere around the box of each meshlet's vertices and the
+    ## cone of its triangle normals, as (N,8) float32.
+    points = positions[vertices].astype(np.float64)
+    vertex_offsets = meshlets[:,0]
+    low = np.minimum.reduceat(points, vertex_offsets, axis=0)
+    high = np.maximum.reduceat(points, vertex_offsets, axis=0)
+    centers = (low + high) * 0.5
+    owner = np.repeat(np.arange(len(meshlets)), meshlets[:,1])
+    radii = np.maximum.reduceat(np.linalg.norm(points - centers[owner], axis=1), vertex_offsets)
+
+    corners = positions[faces.reshape(-1, 3)[order]].astype(np.float64)
+    normals = np.cross(corners[:,1] - corners[:,0], corners[:,2] - corners[:,0])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-30)[:,None]
+    triangle_offsets = meshlets[:,2]
+    axes = np.add.reduceat(normals, triangle_offsets, axis=0)
+    axes /= np.maximum(np.linalg.norm(axes, axis=1), 1e-30)[:,None]
+    owner = np.repeat(np.arange(len(meshlets)), meshlets[:,3])
+    spread = np.minimum.reduceat(np.einsum('ij,ij->i', normals, axes[owner]), triangle_offsets)
+    # The cutoff is the sine of the cone's half angle. Cones of 90 degrees
+    # or more can never be culled, which a cutoff of 1 encodes.
+    cutoffs = np.where(spread <= 0.0, 1.0, np.sqrt(np.maximum(1.0 - spread * spread, 0.0)))
+    return np.concatenate((centers, radii[:,None], axes, cutoffs[:,None]), axis=1).astype(np.float32)
+
+def build_meshlets(positions, faces, max_vertices=64, max_triangles=124):
+    ## Returns an Sf3Meshlets for the (N,3) positions and index buffer.
+    triangles = faces.reshape(-1, 3)
+    meshlets = Sf3Meshlets()
+    meshlets.magic = Sf3Meshlets.MAGIC
+    meshlets.max_vertices = max_vertices
+    meshlets.max_triangles = max_triangles
+    if len(triangles) == 0:
+        (table, vertices, local, bounds) = (np.zeros((0, 4), np.uint32), np.zeros(0, np.uint32),
+                                             np.zeros(0, np.uint8), np.zeros((0, 8), np.float32))
+    else:
+        order = np.argsort(morton_codes(positions[triangles].mean(axis=1)), kind='stable')
+        (table, vertices, local) = partition(faces, max_vertices, max_triangles, order)
+        bounds = meshlet_bounds(positions, faces, table, vertices, order)
+    meshlets.meshlet_count = len(table)
+    meshlets.vertex_count = len(vertices)
+    meshlets.triangle_count = len(local) // 3
+    meshlets.meshlets = table.ravel()
+    meshlets.bounds = bounds.ravel()
+    meshlets.vertices = vertices
+    meshlets.triangles = local
+    return meshlets
+
+def export_meshlets(file, positions, faces, config={}):
+    print("Exporting meshlets to "+file)
+    meshlets = build_meshlets(positions, faces, config['meshlet_vertices'], config['meshlet_triangles'])
+    meshlets._check()
+    f = open(file, 'wb')
+    with KaitaiStream(f) as _io:
+        meshlets._write(_io)
+    return file
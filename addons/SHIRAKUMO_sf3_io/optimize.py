@@ -0,0 +1,93 @@
+import numpy as np
+
+## Triangle and vertex reordering passes for exported index buffers. These
+## don't change the mesh, only the order in which a GPU will see it.
+
+def cache_misses(faces, cache_size=16):
+    ## Simulates a FIFO post-transform cache and returns the number of
+    ## vertices that would have to be transformed.
+    faces = faces.tolist()
+    time = {}
+    misses = 0
+    for v in faces:
+        if misses - time.get(v, -cache_size) >= cache_size:
+            time[v] = misses
+            misses += 1
+    return misses
+
+def cache_statistics(faces, vertex_count, cache_size=16):
+    ## Returns (ACMR, ATVR): transformed vertices per triangle and per
+    ## vertex. 0.5 and 1.0 respectively are the best possible.
+    misses = cache_misses(faces, cache_size)
+    return (misses / max(1, len(faces) // 3), misses / max(1, vertex_count))
+
+def optimize_vertex_cache(faces, vertex_count, cache_size=16):
+    ## Reorders the triangles for post-transform cache locality using
+    ## Tipsify (Sander, Nehab & Barczak 2007), which runs in linear time.
+    ## Winding is preserved.
+    triangle_count = len(faces) // 3
+    if triangle_count == 0:
+        return faces
+    # Vertex -> triangle adjacency in CSR form.
+    live = np.bincount(faces, minlength=vertex_count)
+    starts = np.concatenate(([0], np.cumsum(live))).tolist()
+    adjacency = (np.argsort(faces, kind='stable') // 3).tolist()
+    live = live.tolist()
+    indices = faces.tolist()
+    stamps = [0] * vertex_count
+    emitted = [False] * triangle_count
+    dead_ends = []
+    out = []
+    time = cache_size + 1
+    cursor = 0
+    fan = 0
+    while 0 <= fan:
+        candidates = []
+        for j in range(starts[fan], starts[fan+1]):
+            t = adjacency[j]
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            for v in indices[t*3:t*3+3]:
+                out.append(v)
+                dead_ends.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if cache_size < time - stamps[v]:
+                    stamps[v] = time
+                    time += 1
+        # Pick the candidate that will still be in the cache after its
+        # remaining triangles are emitted, preferring the oldest one.
+        fan = -1
+        best = -1
+        for v in candidates:
+            if 0 < live[v]:
+                priority = 0
+                if time - stamps[v] + 2 * live[v] <= cache_size:
+                    priority = time - stamps[v]
+                if best < priority:
+                    best = priority
+                    fan = v
+        if fan < 0:
+            while dead_ends:
+                v = dead_ends.pop()
+                if 0 < live[v]:
+                    fan = v
+                    break
+        if fan < 0:
+            while cursor < vertex_count:
+                if 0 < live[cursor]:
+                    fan = cursor
+                    break
+                cursor += 1
+    return np.array(out, dtype=faces.dtype)
+
+def optimize_vertex_fetch(vertices, faces):
+    ## Renumbers the vertices in the order the index buffer first uses them,
+    ## so that vertex fetches walk memory mostly linearly. Unreferenced
+    ## vertices are dropped.
+    used, first = np.unique(faces, return_index=True)
+    order = used[np.argsort(first, kind='stable')]
+    remap = np.empty(len(vertices), dtype=np.uint32)
+    remap[order] = np.arange(len(order), dtype=np.uint32)
+    return (vertices[order], remap[faces])
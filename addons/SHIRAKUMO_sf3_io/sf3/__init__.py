@@ -1,3 +1,10 @@
+from .sf3_archive import *
 from .sf3_image import *
 from .sf3_model import *
 from .sf3_physics_model import *
+from .sf3_meshlets import Sf3Meshlets
+from .sf3_bounds import Sf3Bounds
+from .formats import MAGIC, HEADER_SIZE, FORMATS, SIDECARS, format_id, format_class, sidecar_path, load_sidecar
+from .probe import probe, register_prober
+from .archive_index import ArchiveIndex, index_archive
+from .image_reader import ImageReader
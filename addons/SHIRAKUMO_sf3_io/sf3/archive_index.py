@@ -0,0 +1,87 @@
+# Lookups of Sf3Archive entries by path and mime type. The index is built
+# from the meta entries the first time an archive is looked up in and
+# kept on the archive after that.
+
+import bisect
+import fnmatch
+
+class ArchiveIndex(object):
+    """Indices over the entries of an Sf3Archive.Archive. paths maps each
+    entry path to its index, mimes each mime type to the list of indices of
+    its entries.
+    """
+    def __init__(self, archive):
+        self.archive = archive
+        self.paths = {}
+        self.mimes = {}
+        for i in range(len(archive.meta_entries)):
+            entry = archive.meta_entries[i]
+            self.paths[entry.path.value] = i
+            self.mimes.setdefault(entry.mime.value, []).append(i)
+        self._sorted_paths = None
+
+    @property
+    def sorted_paths(self):
+        if self._sorted_paths is None:
+            self._sorted_paths = sorted(self.paths)
+        return self._sorted_paths
+
+    def find(self, path):
+        """Returns the index of the entry with the given path, or None."""
+        return self.paths.get(path)
+
+    def by_mime(self, mime):
+        """Returns the indices of all entries of the given mime type in
+        archive order.
+        """
+        return self.mimes.get(mime, [])
+
+    def glob(self, pattern, mime=None):
+        """Returns the indices of all entries whose path matches the
+        fnmatch-style pattern, in path order, optionally restricted to one
+        mime type. The literal prefix of the pattern is looked up by
+        bisection, so "textures/*" only visits entries under textures/.
+        Note that * also matches across /.
+        """
+        prefix = pattern
+        for c in '*?[':
+            prefix = prefix.split(c, 1)[0]
+        paths = self.sorted_paths
+        allowed = None if mime is None else set(self.by_mime(mime))
+        result = []
+        for j in range(bisect.bisect_left(paths, prefix), len(paths)):
+            path = paths[j]
+            if not path.startswith(prefix):
+                break
+            if fnmatch.fnmatchcase(path, pattern):
+                i = self.paths[path]
+                if allowed is None or i in allowed:
+                    result.append(i)
+        return result
+
+def index_archive(archive):
+    """Returns the ArchiveIndex of the Sf3Archive.Archive, building it on
+    first use.
+    """
+    index = getattr(archive, '_archive_index', None)
+    if index is None:
+        index = archive._archive_index = ArchiveIndex(archive)
+    return index
+
+def find(archive, path):
+    """Returns the index of the entry of the archive with the given path,
+    or None.
+    """
+    return index_archive(archive).find(path)
+
+def by_mime(archive, mime):
+    """Returns the indices of the entries of the archive of the given mime
+    type, see ArchiveIndex.by_mime.
+    """
+    return index_archive(archive).by_mime(mime)
+
+def glob(archive, pattern, mime=None):
+    """Returns the indices of the entries of the archive that match the
+    pattern, see ArchiveIndex.glob.
+    """
+    return index_archive(archive).glob(pattern, mime)
@@ -0,0 +1,60 @@
+import os
+from .sf3_archive import Sf3Archive
+from .sf3_image import Sf3Image
+from .sf3_model import Sf3Model
+from .sf3_physics_model import Sf3PhysicsModel
+from .sf3_meshlets import Sf3Meshlets
+from .sf3_bounds import Sf3Bounds
+from .archive_index import find
+
+# Every SF3 file starts with the magic, a format ID byte, a CRC32 of the
+# payload and a null byte, for 16 bytes in total.
+MAGIC = b"\x81\x53\x46\x33\x00\xE0\xD0\x0D\x0A\x0A"
+HEADER_SIZE = 16
+
+FORMATS = {
+    1: Sf3Archive,
+    3: Sf3Image,
+    5: Sf3Model,
+    6: Sf3PhysicsModel,
+}
+
+# Sidecars carry precomputed data for a model and sit next to it, with the
+# model's extension replaced by their own.
+SIDECARS = [Sf3Meshlets, Sf3Bounds]
+
+def format_id(buf):
+    """Returns the format ID of the SF3 file whose leading bytes are in buf,
+    or None if buf does not start with an SF3 header.
+    """
+    if len(buf) < HEADER_SIZE or bytes(buf[0:len(MAGIC)]) != MAGIC or buf[HEADER_SIZE-1] != 0:
+        return None
+    return buf[len(MAGIC)]
+
+def format_class(buf):
+    """Returns the parser class for the SF3 file whose leading bytes are in
+    buf, or None if it is not an SF3 file of a known format.
+    """
+    return FORMATS.get(format_id(buf))
+
+def sidecar_path(path, cls):
+    """Returns the path of the sidecar of class cls that belongs to the
+    model at path, so foo.mod.sf3 gives foo.mod.bounds for Sf3Bounds.
+    """
+    return os.path.splitext(path)[0] + cls.EXTENSION
+
+def load_sidecar(path, cls, archive=None):
+    """Parses the sidecar of class cls that belongs to the model at path,
+    or returns None if there is none. If archive is an Sf3Archive.Archive,
+    path is an entry in it, otherwise a file on disk. Only the sidecar is
+    read, the model's own data is never touched.
+    """
+    if archive is not None:
+        i = find(archive, sidecar_path(path, cls))
+        if i is None:
+            return None
+        return cls.from_buffer(archive.file_payloads[i].payload)
+    file = sidecar_path(path, cls)
+    if not os.path.exists(file):
+        return None
+    return cls.from_mmap(file)
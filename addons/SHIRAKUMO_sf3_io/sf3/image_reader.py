@@ -0,0 +1,113 @@
+# Streaming access to the samples of an Sf3Image. Only the header is parsed
+# up front. Rows, bands and tiles are NumPy views straight into the file
+# mapping or buffer, so the working set is whatever the caller touches
+# rather than the whole image.
+
+from .kaitaistruct import KaitaiStream, BufferIO, mmap_file, close_buffer
+from .formats import HEADER_SIZE, format_class
+from .probe import probe_image
+from .sf3_image import Sf3Image
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Storage type of the samples of each format. float16 is stored as its raw
+# bits and viewed as numpy.float16 afterwards.
+SAMPLE_TYPES = {
+    Sf3Image.Formats.int8: '<i1',
+    Sf3Image.Formats.int16: '<i2',
+    Sf3Image.Formats.int32: '<i4',
+    Sf3Image.Formats.int64: '<i8',
+    Sf3Image.Formats.uint8: '<u1',
+    Sf3Image.Formats.uint16: '<u2',
+    Sf3Image.Formats.uint32: '<u4',
+    Sf3Image.Formats.uint64: '<u8',
+    Sf3Image.Formats.float16: '<f2',
+    Sf3Image.Formats.float32: '<f4',
+    Sf3Image.Formats.float64: '<f8',
+}
+
+class ImageReader(object):
+    """Reads the samples of an SF3 image from a buffer, such as an mmap or
+    an archive payload, without parsing them. Requires NumPy.
+
+    The header fields are available as width, height, depth,
+    channel_format, format and channel_count, just like on
+    Sf3Image.Image. All sample arrays handed out are read-only views of
+    shape (rows, columns, channel_count) into the buffer.
+    """
+    def __init__(self, buffer):
+        if numpy is None:
+            raise Exception("Reading images by band requires NumPy")
+        if format_class(buffer) is not Sf3Image:
+            raise Exception("Not an SF3 image")
+        self._buffer = buffer
+        io = KaitaiStream(BufferIO(buffer))
+        io.seek(HEADER_SIZE)
+        header = probe_image(io)
+        self.width = header['width']
+        self.height = header['height']
+        self.depth = header['depth']
+        self.channel_format = header['channel_format']
+        self.format = header['sample_format']
+        self.channel_count = int(self.channel_format) & 15
+        dtype = SAMPLE_TYPES.get(self.format)
+        if dtype is None:
+            raise Exception("Unsupported image pixel format: {0}".format(self.format))
+        self.dtype = numpy.dtype(dtype)
+        self._offset = io.pos()
+        count = self.depth * self.height * self.width * self.channel_count
+        if len(buffer) < self._offset + count * self.dtype.itemsize:
+            raise EOFError("requested %d bytes, but only %d bytes available" % (
+                self._offset + count * self.dtype.itemsize, len(buffer)))
+        self._samples = numpy.frombuffer(buffer, self.dtype, count, self._offset).reshape(
+            self.depth, self.height, self.width, self.channel_count)
+
+    @classmethod
+    def from_mmap(cls, filename):
+        return cls(mmap_file(filename))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        self._samples = None
+        close_buffer(self._buffer)
+
+    def band_rows(self, samples=1 << 20):
+        """Returns the number of rows in a band of about the given number of
+        pixels.
+        """
+        return max(1, samples // max(self.width, 1))
+
+    def rows(self, start, end, z=0):
+        """Returns rows start to end of the zth slice."""
+        return self._samples[z, start:end]
+
+    def tile(self, x, y, width, height, z=0):
+        """Returns the tile of the given size at x, y of the zth slice,
+        clipped to the image.
+        """
+        return self._samples[z, y:y+height, x:x+width]
+
+    def bands(self, rows=None, z=0):
+        """Yields (y, band) for consecutive bands of the zth slice, each
+        rows high except for the last one. By default a band holds about
+        a million pixels, see band_rows().
+        """
+        rows = rows or self.band_rows()
+        for y in range(0, self.height, rows):
+            yield (y, self.rows(y, y+rows, z))
+
+    def tiles(self, size=256, z=0):
+        """Yields (x, y, tile) for the tiles of the zth slice in row major
+        order. Tiles along the right and bottom edge are clipped.
+        """
+        for y in range(0, self.height, size):
+            for x in range(0, self.width, size):
+                yield (x, y, self.tile(x, y, size, size, z))
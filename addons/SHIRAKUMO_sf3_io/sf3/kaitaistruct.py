@@ -1,7 +1,9 @@
+import array
 import itertools
+import mmap
 import sys
 import struct
-from io import open, BytesIO, SEEK_CUR, SEEK_END  # noqa
+from io import open, BytesIO, SEEK_SET, SEEK_CUR, SEEK_END  # noqa
 
 PY2 = sys.version_info[0] == 2
 
@@ -24,6 +26,38 @@ API_VERSION = (0, 11)
 # pylint: disable=useless-object-inheritance,super-with-arguments,consider-using-f-string
 
 
+def mmap_file(filename):
+    """Maps the file read-only into memory and returns the mapping."""
+    with open(filename, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return b''
+
+
+def close_buffer(buf):
+    """Closes buf, such as an mmap, if it can be closed. While views into
+    it are still alive it stays open, and is released once the last of
+    them is collected.
+    """
+    close = getattr(buf, 'close', None)
+    if close is not None:
+        try:
+            close()
+        except BufferError:
+            pass
+
+
+def _array_typecode(size, candidates):
+    # The widths of the C types behind array.array typecodes differ between
+    # platforms, so pick the first candidate that matches the wire size.
+    for typecode in candidates:
+        if array.array(typecode).itemsize == size:
+            return typecode
+    raise Exception("no array typecode with item size %d" % (size,))
+
+
 class KaitaiStruct(object):
     def __init__(self, stream):
         self._io = stream
@@ -49,6 +83,31 @@ class KaitaiStruct(object):
             f.close()
             raise
 
+    @classmethod
+    def from_mmap(cls, filename):
+        """Like from_file, but maps the file into memory instead. Byte arrays
+        and typed arrays read from the resulting stream are memoryviews into
+        the mapping rather than copies.
+        """
+        io = BufferIO(mmap_file(filename))
+        try:
+            inst = cls(KaitaiStream(io))
+            inst._read()
+            return inst
+        except Exception:
+            io.close()
+            raise
+
+    @classmethod
+    def from_buffer(cls, buf):
+        """Parses buf, which may be bytes, a memoryview or any other buffer,
+        without copying it. Byte arrays and typed arrays read from it are
+        memoryviews into buf.
+        """
+        inst = cls(KaitaiStream(BufferIO(buf)))
+        inst._read()
+        return inst
+
     @classmethod
     def from_bytes(cls, buf):
         return cls(KaitaiStream(BytesIO(buf)))
@@ -169,6 +228,29 @@ class KaitaiStream(object):
 
     # endregion
 
+    # region Typecodes for typed arrays
+
+    typecode_s1 = 'b'
+    typecode_s2 = _array_typecode(2, 'hi')
+    typecode_s4 = _array_typecode(4, 'ilq')
+    typecode_s8 = _array_typecode(8, 'qli')
+
+    typecode_u1 = 'B'
+    typecode_u2 = _array_typecode(2, 'HI')
+    typecode_u4 = _array_typecode(4, 'ILQ')
+    typecode_u8 = _array_typecode(8, 'QLI')
+
+    typecode_f4 = _array_typecode(4, 'f')
+    typecode_f8 = _array_typecode(8, 'd')
+
+    big_endian_host = sys.byteorder == 'big'
+
+    typecode_kinds = dict([(c, 'i') for c in 'bhilq'] +
+                          [(c, 'u') for c in 'BHILQ'] +
+                          [(c, 'f') for c in 'efd'])
+
+    # endregion
+
     # region Reading
 
     # region Integer numbers
@@ -265,6 +347,89 @@ class KaitaiStream(object):
 
     # endregion
 
+    # region Typed arrays
+
+    def read_array(self, typecode, n, big_endian=False):
+        """Reads n consecutive numbers of the given array.array typecode in a
+        single read, returning them as an array.array. Bytes are only swapped
+        if the byte order of the host differs from the one in the stream.
+        On memoryview-backed streams a memoryview cast to the typecode is
+        returned instead when no swapping is needed.
+        """
+        arr = array.array(typecode)
+        buf = self.read_bytes(n * arr.itemsize)
+        if isinstance(buf, memoryview) and (arr.itemsize == 1 or big_endian == KaitaiStream.big_endian_host):
+            # Zero-copy: reinterpret the mapped bytes in place.
+            return buf.cast(typecode)
+        arr.frombytes(buf)
+        if arr.itemsize > 1 and big_endian != KaitaiStream.big_endian_host:
+            arr.byteswap()
+        return arr
+
+    def read_array_s1(self, n):
+        return self.read_array(KaitaiStream.typecode_s1, n)
+
+    def read_array_u1(self, n):
+        return self.read_array(KaitaiStream.typecode_u1, n)
+
+    # region Big-endian
+
+    def read_array_s2be(self, n):
+        return self.read_array(KaitaiStream.typecode_s2, n, True)
+
+    def read_array_s4be(self, n):
+        return self.read_array(KaitaiStream.typecode_s4, n, True)
+
+    def read_array_s8be(self, n):
+        return self.read_array(KaitaiStream.typecode_s8, n, True)
+
+    def read_array_u2be(self, n):
+        return self.read_array(KaitaiStream.typecode_u2, n, True)
+
+    def read_array_u4be(self, n):
+        return self.read_array(KaitaiStream.typecode_u4, n, True)
+
+    def read_array_u8be(self, n):
+        return self.read_array(KaitaiStream.typecode_u8, n, True)
+
+    def read_array_f4be(self, n):
+        return self.read_array(KaitaiStream.typecode_f4, n, True)
+
+    def read_array_f8be(self, n):
+        return self.read_array(KaitaiStream.typecode_f8, n, True)
+
+    # endregion
+
+    # region Little-endian
+
+    def read_array_s2le(self, n):
+        return self.read_array(KaitaiStream.typecode_s2, n)
+
+    def read_array_s4le(self, n):
+        return self.read_array(KaitaiStream.typecode_s4, n)
+
+    def read_array_s8le(self, n):
+        return self.read_array(KaitaiStream.typecode_s8, n)
+
+    def read_array_u2le(self, n):
+        return self.read_array(KaitaiStream.typecode_u2, n)
+
+    def read_array_u4le(self, n):
+        return self.read_array(KaitaiStream.typecode_u4, n)
+
+    def read_array_u8le(self, n):
+        return self.read_array(KaitaiStream.typecode_u8, n)
+
+    def read_array_f4le(self, n):
+        return self.read_array(KaitaiStream.typecode_f4, n)
+
+    def read_array_f8le(self, n):
+        return self.read_array(KaitaiStream.typecode_f8, n)
+
+    # endregion
+
+    # endregion
+
     # region Unaligned bit values
 
     def align_to_byte(self):
@@ -390,7 +555,7 @@ class KaitaiStream(object):
         self.align_to_byte()
         r = b''
         while True:
-            c = self._io.read(1)
+            c = bytes(self._io.read(1))
             if c == b'':
                 if eos_error:
                     raise Exception(
@@ -420,10 +585,14 @@ class KaitaiStream(object):
 
     @staticmethod
     def bytes_strip_right(data, pad_byte):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
         return data.rstrip(KaitaiStream.byte_from_int(pad_byte))
 
     @staticmethod
     def bytes_terminate(data, term, include_term):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
         new_data, term_byte, _ = data.partition(KaitaiStream.byte_from_int(term))
         if include_term:
             new_data += term_byte
@@ -542,6 +711,99 @@ class KaitaiStream(object):
 
     # endregion
 
+    # region Typed arrays
+
+    def write_array(self, typecode, data, big_endian=False):
+        """Writes a sequence of numbers of the given array.array typecode in
+        a single write. data may be an array.array, a NumPy array or any
+        other buffer; buffers of a matching type are written as-is, anything
+        else is converted first.
+        """
+        try:
+            buf = memoryview(data)
+        except TypeError:
+            buf = memoryview(array.array(typecode, data))
+        if (buf.itemsize != array.array(typecode).itemsize or
+                KaitaiStream.typecode_kinds.get(buf.format.lstrip('@=')) != KaitaiStream.typecode_kinds[typecode]):
+            if hasattr(data, 'astype'):
+                buf = memoryview(data.astype(typecode))
+            else:
+                buf = memoryview(array.array(typecode, data))
+        if not buf.c_contiguous:
+            # Copy through the typecode so that the itemsize, and with it the
+            # byte swap below, survives.
+            buf = memoryview(array.array(typecode, buf.tobytes()))
+        if buf.itemsize > 1 and big_endian != KaitaiStream.big_endian_host:
+            arr = array.array(typecode)
+            arr.frombytes(buf.cast('B'))
+            arr.byteswap()
+            buf = memoryview(arr)
+        self.write_bytes(buf.cast('B'))
+
+    def write_array_s1(self, v):
+        self.write_array(KaitaiStream.typecode_s1, v)
+
+    def write_array_u1(self, v):
+        self.write_array(KaitaiStream.typecode_u1, v)
+
+    # region Big-endian
+
+    def write_array_s2be(self, v):
+        self.write_array(KaitaiStream.typecode_s2, v, True)
+
+    def write_array_s4be(self, v):
+        self.write_array(KaitaiStream.typecode_s4, v, True)
+
+    def write_array_s8be(self, v):
+        self.write_array(KaitaiStream.typecode_s8, v, True)
+
+    def write_array_u2be(self, v):
+        self.write_array(KaitaiStream.typecode_u2, v, True)
+
+    def write_array_u4be(self, v):
+        self.write_array(KaitaiStream.typecode_u4, v, True)
+
+    def write_array_u8be(self, v):
+        self.write_array(KaitaiStream.typecode_u8, v, True)
+
+    def write_array_f4be(self, v):
+        self.write_array(KaitaiStream.typecode_f4, v, True)
+
+    def write_array_f8be(self, v):
+        self.write_array(KaitaiStream.typecode_f8, v, True)
+
+    # endregion
+
+    # region Little-endian
+
+    def write_array_s2le(self, v):
+        self.write_array(KaitaiStream.typecode_s2, v)
+
+    def write_array_s4le(self, v):
+        self.write_array(KaitaiStream.typecode_s4, v)
+
+    def write_array_s8le(self, v):
+        self.write_array(KaitaiStream.typecode_s8, v)
+
+    def write_array_u2le(self, v):
+        self.write_array(KaitaiStream.typecode_u2, v)
+
+    def write_array_u4le(self, v):
+        self.write_array(KaitaiStream.typecode_u4, v)
+
+    def write_array_u8le(self, v):
+        self.write_array(KaitaiStream.typecode_u8, v)
+
+    def write_array_f4le(self, v):
+        self.write_array(KaitaiStream.typecode_f4, v)
+
+    def write_array_f8le(self, v):
+        self.write_array(KaitaiStream.typecode_f8, v)
+
+    # endregion
+
+    # endregion
+
     # region Unaligned bit values
 
     def write_align_to_byte(self):
@@ -780,6 +1042,107 @@ class KaitaiStream(object):
         self.write_back_handler.write_back(parent)
 
 
+class LazyStructArray(object):
+    """Read-only sequence of structs of type cls that live at base+offsets[i]
+    in a stream. An entry is only parsed when it is indexed, and parsed
+    entries are not retained, so memory use is bounded by what the caller
+    keeps alive rather than by the size of the stream.
+    """
+    def __init__(self, cls, io, parent, root, base, offsets):
+        self._cls = cls
+        self._io = io
+        self._parent = parent
+        self._root = root
+        self._base = base
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        for i in range(len(self._offsets)):
+            yield self[i]
+
+    def span(self, i):
+        """Returns the stream positions between which the ith entry lies,
+        without parsing it. Entries are taken to run up to the next one, or
+        to the end of the stream for the last.
+        """
+        start = self._base + self._offsets[i]
+        if i + 1 < len(self._offsets):
+            return (start, self._base + self._offsets[i+1])
+        # KaitaiStream.size() does not report the real size, see there.
+        io = self._io._io
+        _pos = io.tell()
+        try:
+            end = io.seek(0, SEEK_END)
+        finally:
+            io.seek(_pos)
+        return (start, end)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._offsets)))]
+        if i < 0:
+            i += len(self._offsets)
+        if not 0 <= i < len(self._offsets):
+            raise IndexError("struct index out of range")
+        _pos = self._io.pos()
+        try:
+            self._io.seek(self._base + self._offsets[i])
+            inst = self._cls(self._io, self._parent, self._root)
+            inst._read()
+        finally:
+            self._io.seek(_pos)
+        return inst
+
+
+class BufferIO(object):
+    """Read-only, seekable file-like object over a buffer such as an mmap.
+    Unlike BytesIO, read() returns memoryview slices into the buffer rather
+    than copies of its contents.
+    """
+    def __init__(self, buf):
+        self._buf = buf
+        self._view = memoryview(buf).cast('B')
+        self._pos = 0
+
+    def read(self, n=-1):
+        start = self._pos
+        end = len(self._view)
+        if n is not None and 0 <= n:
+            end = min(start + n, end)
+        self._pos = max(start, end)
+        return self._view[start:end]
+
+    def seek(self, n, whence=SEEK_SET):
+        if whence == SEEK_CUR:
+            n += self._pos
+        elif whence == SEEK_END:
+            n += len(self._view)
+        if n < 0:
+            raise ValueError("negative seek position %d" % (n,))
+        self._pos = n
+        return n
+
+    def tell(self):
+        return self._pos
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def getbuffer(self):
+        return self._view
+
+    def close(self):
+        self._view.release()
+        # Views handed out by read() may still be alive.
+        close_buffer(self._buf)
+
+
 class KaitaiStructError(Exception):
     """Common ancestor for all error originating from Kaitai Struct usage.
     Stores KSY source path, pointing to an element supposedly guilty of
@@ -0,0 +1,234 @@
+# Parses SF3 files in a pool of worker processes. The workers copy the bulk
+# arrays of every model they find into one shared memory block per file and
+# only send the small metadata and the layout of that block back through
+# the result pipe. The main process then rebuilds Sf3Model.Model instances
+# whose vertex data are views into the block, so nothing gets pickled or
+# copied on the way back.
+#
+# The pool is started with the spawn method and resolves its work function
+# through the top-level sf3 package, which lets it run inside of programs
+# like Blender where the package is nested in an add-on that cannot be
+# imported outside of them.
+#
+# Only models, standalone or inside of an archive, are preloaded. Anything
+# else has to be imported the usual way.
+
+import importlib
+import multiprocessing
+import os
+import site
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+import numpy
+from .kaitaistruct import mmap_file, close_buffer
+from .formats import format_class
+from .sf3_archive import Sf3Archive
+from .sf3_model import Sf3Model
+
+# Blocks kept open by this worker, see share().
+_blocks = []
+
+class _Module(object):
+    # Pickles as an import of the named module in the unpickling process.
+    def __init__(self, name):
+        self.name = name
+
+    def __reduce__(self):
+        return (importlib.import_module, (self.name,))
+
+class _Function(object):
+    # Pickles as the function of the given name in a module, see _Module.
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+
+    def __reduce__(self):
+        return (getattr, (_Module(self.module), self.name))
+
+def model_arrays(model):
+    ## The metadata and bulk arrays of a parsed Sf3Model.Model.
+    meta = (model.format.raw, model.material_type.raw, [tex.value for tex in model.material.textures])
+    return (meta, [numpy.asarray(model.vertex_data.faces, dtype=numpy.uint32),
+                   numpy.asarray(model.vertex_data.vertices, dtype=numpy.float32)])
+
+def share(models):
+    ## Copies the arrays of the models into a new shared memory block and
+    ## returns its name with the metadata and (offset, dtype, shape) layout
+    ## of the arrays in place of the arrays themselves.
+    size = 0
+    layouts = {}
+    for (key, (meta, arrays)) in models.items():
+        layout = []
+        for array in arrays:
+            layout.append((size, array.dtype.str, array.shape))
+            size += (array.nbytes + 15) & ~15
+        layouts[key] = (meta, layout)
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for (key, (meta, arrays)) in models.items():
+        for (array, (offset, dtype, shape)) in zip(arrays, layouts[key][1]):
+            numpy.ndarray(shape, dtype, buffer=block.buf, offset=offset)[...] = array
+    name = block.name
+    if os.name == 'nt':
+        # Windows frees a block along with its last handle, so it has to
+        # stay open here until the main process has opened it, see
+        # release().
+        _blocks.append(block)
+    else:
+        # Ownership passes to the main process, which unlinks the block
+        # once it is done with it. The worker's resource tracker must not
+        # do so when the worker exits.
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(block._name, 'shared_memory')
+        except Exception:
+            pass
+        block.close()
+    return (name, layouts)
+
+def parse(path):
+    """Parses the file at path and returns its models the same way as
+    Preloaded.models does, but as views into a mapping of the file rather
+    than into shared memory. Files without models yield an empty dict.
+    """
+    buffer = mmap_file(path)
+    cls = format_class(buffer)
+    if cls is Sf3Model:
+        return Sf3Model.from_buffer(buffer).model
+    models = {}
+    if cls is Sf3Archive:
+        archive = Sf3Archive.from_buffer(buffer).archive
+        for i in range(0, len(archive.meta_entries)):
+            payload = archive.file_payloads[i].payload
+            if format_class(payload) is Sf3Model:
+                models[archive.meta_entries[i].path.value] = Sf3Model.from_buffer(payload).model
+    return models
+
+def release(names):
+    ## Closes the blocks of this worker that the main process has opened
+    ## since, which leaves their lifetime up to it.
+    for block in [block for block in _blocks if block.name in names]:
+        block.close()
+        _blocks.remove(block)
+
+def load(path, released=()):
+    ## Work function of the pool. Parses the file at path and shares the
+    ## models in it, keyed by None for a model file. Blocks named in
+    ## released are closed first.
+    release(released)
+    models = parse(path)
+    if not isinstance(models, dict):
+        models = {None: models}
+    result = share(dict((key, model_arrays(model)) for (key, model) in models.items()))
+    del models
+    return result
+
+def rebuild_model(meta, faces, vertices):
+    ## Sf3Model.Model with the given metadata over the given arrays.
+    (format, material_type, textures) = meta
+    model = Sf3Model.Model()
+    model.format = Sf3Model.VertexFormat(_parent=model)
+    model.format.raw = format
+    model.material_type = Sf3Model.MaterialType(_parent=model)
+    model.material_type.raw = material_type
+    model.material = Sf3Model.Material(_parent=model)
+    model.material.textures = []
+    for tex in textures:
+        string = Sf3Model.String2(_parent=model.material)
+        string.value = tex
+        string.len = len(tex.encode('utf-8')) + 1
+        model.material.textures.append(string)
+    model.material_size = sum([tex.len+2 for tex in model.material.textures])
+    model.vertex_data = Sf3Model.VertexData(_parent=model)
+    model.vertex_data.face_count = len(faces)
+    model.vertex_data.faces = faces
+    model.vertex_data.vertex_count = len(vertices)
+    model.vertex_data.vertices = vertices
+    return model
+
+class Preloaded(object):
+    """The models a worker parsed out of one file. For a model file, models
+    is the Sf3Model.Model itself, for an archive a dict of them by entry
+    path. Their vertex data live in shared memory, which is released by
+    close(), so they must not be used after that.
+    """
+    def __init__(self, name, layouts):
+        self.name = name
+        self._block = shared_memory.SharedMemory(name=name)
+        models = {}
+        for (key, (meta, layout)) in layouts.items():
+            arrays = [numpy.ndarray(shape, dtype, buffer=self._block.buf, offset=offset)
+                      for (offset, dtype, shape) in layout]
+            models[key] = rebuild_model(meta, *arrays)
+        self.models = models.pop(None, models)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        if self._block is None:
+            return
+        self.models = None
+        close_buffer(self._block)
+        self._block.unlink()
+        self._block = None
+
+def worker_count(workers=None):
+    """Returns the number of worker processes to use for the given setting,
+    where None or 0 means one per CPU.
+    """
+    return workers or os.cpu_count() or 1
+
+def preload(paths, workers=None):
+    """Parses the files at the given paths in a pool of worker processes and
+    yields (path, result) in the order they finish. The result is either a
+    Preloaded, which the caller has to close, or the exception that parsing
+    the file raised. Closing the generator early cancels the files that
+    have not been started yet and returns without waiting for the rest.
+    """
+    context = multiprocessing.get_context('spawn')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    module = __name__.rsplit('.', 2)
+    function = _Function('.'.join(module[-2:]), 'load')
+    count = min(worker_count(workers), len(paths))
+    pool = ProcessPoolExecutor(max_workers=count, mp_context=context,
+                               initializer=site.addsitedir, initargs=(root,))
+    # Files are handed out a few at a time, so that every new one can tell
+    # the workers which of their blocks have been taken over since.
+    queued = list(reversed(paths))
+    futures = {}
+    released = []
+    def submit():
+        while queued and len(futures) < 2 * count:
+            path = queued.pop()
+            futures[pool.submit(function, path, tuple(released))] = path
+    try:
+        submit()
+        while futures:
+            (done, _) = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = futures.pop(future)
+                try:
+                    result = Preloaded(*future.result())
+                    released.append(result.name)
+                except Exception as e:
+                    result = e
+                submit()
+                yield (path, result)
+    finally:
+        # Don't wait for files that are still being parsed, their blocks
+        # are released as soon as they come in.
+        pool.shutdown(wait=False, cancel_futures=True)
+        for future in futures:
+            future.add_done_callback(_release)
+
+def _release(future):
+    # Frees the block of a result that nobody is going to pick up.
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        Preloaded(*future.result()).close()
+    except Exception:
+        pass
@@ -0,0 +1,114 @@
+from .kaitaistruct import KaitaiStream
+from .formats import HEADER_SIZE, format_id, format_class
+from .sf3_archive import Sf3Archive
+from .sf3_image import Sf3Image
+from .sf3_model import Sf3Model
+from .sf3_physics_model import Sf3PhysicsModel
+
+# Each prober reads the first-level metadata of its format from a stream
+# positioned just after the header and returns it as a dict. None of them
+# touch the bulk payload.
+probers = {}
+
+# Names of the flags of a vertex format and material type, in bit order.
+VERTEX_ATTRIBUTES = ('position', 'uv', 'color', 'normal', 'tangent')
+MATERIAL_TEXTURES = ('albedo', 'normal', 'metallic', 'metalness', 'roughness', 'occlusion', 'specular', 'emission')
+
+def register_prober(cls, function):
+    probers[cls] = function
+
+def probe(file):
+    """Returns a dict describing the SF3 file at the given path by reading
+    only its header and metadata, or None if it is not an SF3 file. The
+    dict always has the format class, format_id and checksum, plus the
+    format specific keys of the registered prober. The format class is
+    None for formats this package does not know.
+    """
+    with open(file, 'rb') as f:
+        io = KaitaiStream(f)
+        header = f.read(HEADER_SIZE)
+        id = format_id(header)
+        if id is None:
+            return None
+        cls = format_class(header)
+        info = {
+            'format': cls,
+            'format_id': id,
+            'checksum': KaitaiStream.packer_u4le.unpack(header[11:15])[0],
+        }
+        prober = probers.get(cls)
+        if prober is not None:
+            info.update(prober(io))
+        return info
+
+def probe_archive(io):
+    archive = Sf3Archive.Archive(io)
+    archive.entry_count = io.read_u8le()
+    archive.meta_size = io.read_u8le()
+    io.seek(io.pos() + archive.entry_count * 8)
+    entries = []
+    for i in range(archive.entry_count):
+        entry = Sf3Archive.MetaEntry(io, archive)
+        entry._read()
+        entries.append({
+            'path': entry.path.value,
+            'mime': entry.mime.value,
+            'mod_time': entry.mod_time,
+            'checksum': entry.checksum,
+        })
+    return {'entry_count': archive.entry_count, 'entries': entries}
+
+def probe_image(io):
+    width = io.read_u4le()
+    height = io.read_u4le()
+    depth = io.read_u4le()
+    channel_format = KaitaiStream.resolve_enum(Sf3Image.Layouts, io.read_u1())
+    format = KaitaiStream.resolve_enum(Sf3Image.Formats, io.read_u1())
+    return {
+        'width': width,
+        'height': height,
+        'depth': depth,
+        'channel_format': channel_format,
+        'sample_format': format,
+    }
+
+def flags(obj, names):
+    return [name for name in names if getattr(obj, 'has_'+name)]
+
+def probe_model(io):
+    model = Sf3Model.Model(io)
+    model.format = Sf3Model.VertexFormat(io, model)
+    model.format._read()
+    model.material_type = Sf3Model.MaterialType(io, model)
+    model.material_type._read()
+    model.material_size = io.read_u4le()
+    model.material = Sf3Model.Material(io, model)
+    model.material._read()
+    # Skip over the indices rather than reading them.
+    face_count = io.read_u4le()
+    io.seek(io.pos() + face_count * 4)
+    vertex_count = io.read_u4le()
+    stride = model.format.vertex_stride
+    return {
+        'vertex_format': model.format.raw,
+        'vertex_attributes': flags(model.format, VERTEX_ATTRIBUTES),
+        'vertex_stride': stride,
+        'material_type': model.material_type.raw,
+        'materials': flags(model.material_type, MATERIAL_TEXTURES),
+        'textures': [tex.value for tex in model.material.textures],
+        'face_count': face_count,
+        'vertex_count': vertex_count,
+        'triangles': face_count // 3,
+        'vertices': vertex_count // stride if stride else 0,
+    }
+
+def probe_physics_model(io):
+    mass = io.read_f4le()
+    tensor = list(io.read_array_f4le(9))
+    shape_count = io.read_u2le()
+    return {'mass': mass, 'tensor': tensor, 'shape_count': shape_count}
+
+register_prober(Sf3Archive, probe_archive)
+register_prober(Sf3Image, probe_image)
+register_prober(Sf3Model, probe_model)
+register_prober(Sf3PhysicsModel, probe_physics_model)
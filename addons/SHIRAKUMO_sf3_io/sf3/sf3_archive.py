@@ -201,26 +201,16 @@ class Sf3Archive(ReadWriteKaitaiStruct):
         def _read(self):
             self.entry_count = self._io.read_u8le()
             self.meta_size = self._io.read_u8le()
-            self.meta_entry_offsets = []
-            for i in range(self.entry_count):
-                self.meta_entry_offsets.append(self._io.read_u8le())
-
+            self.meta_entry_offsets = self._io.read_array_u8le(self.entry_count)
             self.meta_entries = []
             for i in range(self.entry_count):
                 _t_meta_entries = Sf3Archive.MetaEntry(self._io, self, self._root)
                 _t_meta_entries._read()
                 self.meta_entries.append(_t_meta_entries)
 
-            self.file_offsets = []
-            for i in range(self.entry_count):
-                self.file_offsets.append(self._io.read_u8le())
-
-            self.file_payloads = []
-            for i in range(self.entry_count):
-                _t_file_payloads = Sf3Archive.File(self._io, self, self._root)
-                _t_file_payloads._read()
-                self.file_payloads.append(_t_file_payloads)
-
+            self.file_offsets = self._io.read_array_u8le(self.entry_count)
+            # Payloads are only parsed when indexed, seeking via file_offsets.
+            self.file_payloads = kaitaistruct.LazyStructArray(Sf3Archive.File, self._io, self, self._root, self._io.pos(), self.file_offsets)
 
 
         def _fetch_instances(self):
@@ -0,0 +1,99 @@
+# Bounding volumes of an Sf3Model, stored next to it in a .bounds file with magic "\x81SF3BNDS".
+#
+# All values are little endian and in the model's own coordinate space:
+#   magic           8 bytes
+#   aabb            f4[6]   minimum xyz, maximum xyz
+#   sphere          f4[4]   center xyz, radius
+#   node_count      u4      0 if no BVH was stored
+#   node_bounds     f4[node_count*6]
+#                           minimum xyz, maximum xyz of each node
+#   node_data       u4[node_count*2]
+#                           offset and count of each node
+#   triangle_count  u4
+#   triangles       u4[triangle_count]
+#                           triangle numbers in leaf order
+#
+# The BVH nodes are stored depth first. An interior node has a count of 0,
+# its left child directly follows it and offset is the index of its right
+# child. A leaf covers the triangles[offset:offset+count], where triangle
+# number t is formed by the model's faces[3*t:3*t+3].
+
+from . import kaitaistruct
+from .kaitaistruct import ReadWriteKaitaiStruct
+
+class Sf3Bounds(ReadWriteKaitaiStruct):
+    MAGIC = b"\x81SF3BNDS"
+    MIME = "application/x.sf3-bounds"
+    EXTENSION = ".bounds"
+
+    def __init__(self, _io=None, _parent=None, _root=None):
+        self._io = _io
+        self._parent = _parent
+        self._root = _root if _root else self
+
+    def _read(self):
+        self.magic = self._io.read_bytes(8)
+        if not (self.magic == Sf3Bounds.MAGIC):
+            raise kaitaistruct.ValidationNotEqualError(Sf3Bounds.MAGIC, self.magic, self._io, u"/seq/0")
+        self.aabb = self._io.read_array_f4le(6)
+        self.sphere = self._io.read_array_f4le(4)
+        self.node_count = self._io.read_u4le()
+        self.node_bounds = self._io.read_array_f4le(self.node_count * 6)
+        self.node_data = self._io.read_array_u4le(self.node_count * 2)
+        self.triangle_count = self._io.read_u4le()
+        self.triangles = self._io.read_array_u4le(self.triangle_count)
+
+
+    def _fetch_instances(self):
+        pass
+
+
+    def _write__seq(self, io=None):
+        super(Sf3Bounds, self)._write__seq(io)
+        self._io.write_bytes(self.magic)
+        self._io.write_array_f4le(self.aabb)
+        self._io.write_array_f4le(self.sphere)
+        self._io.write_u4le(self.node_count)
+        self._io.write_array_f4le(self.node_bounds)
+        self._io.write_array_u4le(self.node_data)
+        self._io.write_u4le(self.triangle_count)
+        self._io.write_array_u4le(self.triangles)
+
+
+    def _check(self):
+        pass
+        if (len(self.magic) != 8):
+            raise kaitaistruct.ConsistencyError(u"magic", len(self.magic), 8)
+        if not (self.magic == Sf3Bounds.MAGIC):
+            raise kaitaistruct.ValidationNotEqualError(Sf3Bounds.MAGIC, self.magic, None, u"/seq/0")
+        if (len(self.aabb) != 6):
+            raise kaitaistruct.ConsistencyError(u"aabb", len(self.aabb), 6)
+        if (len(self.sphere) != 4):
+            raise kaitaistruct.ConsistencyError(u"sphere", len(self.sphere), 4)
+        if (len(self.node_bounds) != self.node_count * 6):
+            raise kaitaistruct.ConsistencyError(u"node_bounds", len(self.node_bounds), self.node_count * 6)
+        if (len(self.node_data) != self.node_count * 2):
+            raise kaitaistruct.ConsistencyError(u"node_data", len(self.node_data), self.node_count * 2)
+        if (len(self.triangles) != self.triangle_count):
+            raise kaitaistruct.ConsistencyError(u"triangles", len(self.triangles), self.triangle_count)
+
+    @property
+    def minimum(self):
+        return tuple(self.aabb[0:3])
+
+    @property
+    def maximum(self):
+        return tuple(self.aabb[3:6])
+
+    @property
+    def center(self):
+        return tuple(self.sphere[0:3])
+
+    @property
+    def radius(self):
+        return self.sphere[3]
+
+    def node(self, i):
+        """Returns the minimum, maximum, offset and count of the ith BVH node."""
+        b = self.node_bounds[i*6:i*6+6]
+        return (tuple(b[0:3]), tuple(b[3:6]), self.node_data[i*2], self.node_data[i*2+1])
@@ -5,6 +5,11 @@ from . import kaitaistruct
 from .kaitaistruct import ReadWriteKaitaiStruct, KaitaiStream, BytesIO
 from enum import IntEnum
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 if getattr(kaitaistruct, 'API_VERSION', (0, 9)) < (0, 11):
     raise Exception("Incompatible Kaitai Struct Python API: 0.11 or later is required, but you have %s" % (kaitaistruct.__version__))
@@ -106,74 +111,47 @@ class Sf3Image(ReadWriteKaitaiStruct):
             self.channel_format = KaitaiStream.resolve_enum(Sf3Image.Layouts, self._io.read_u1())
             self.format = KaitaiStream.resolve_enum(Sf3Image.Formats, self._io.read_u1())
             self.samples = []
-            for i in range((((self.depth * self.height) * self.width) * self.channel_count)):
-                _on = self.format
-                if _on == Sf3Image.Formats.uint16:
-                    pass
-                    self.samples.append(self._io.read_u2le())
-                elif _on == Sf3Image.Formats.uint64:
-                    pass
-                    self.samples.append(self._io.read_u8le())
-                elif _on == Sf3Image.Formats.int16:
-                    pass
-                    self.samples.append(self._io.read_s2le())
-                elif _on == Sf3Image.Formats.uint32:
-                    pass
-                    self.samples.append(self._io.read_u4le())
-                elif _on == Sf3Image.Formats.float16:
-                    pass
-                    _t_samples = Sf3Image.F2(self._io, self, self._root)
-                    _t_samples._read()
-                    self.samples.append(_t_samples)
-                elif _on == Sf3Image.Formats.int8:
-                    pass
-                    self.samples.append(self._io.read_s1())
-                elif _on == Sf3Image.Formats.float32:
-                    pass
-                    self.samples.append(self._io.read_f4le())
-                elif _on == Sf3Image.Formats.uint8:
-                    pass
-                    self.samples.append(self._io.read_u1())
-                elif _on == Sf3Image.Formats.float64:
-                    pass
-                    self.samples.append(self._io.read_f8le())
-                elif _on == Sf3Image.Formats.int64:
-                    pass
-                    self.samples.append(self._io.read_s8le())
-                elif _on == Sf3Image.Formats.int32:
-                    pass
-                    self.samples.append(self._io.read_s4le())
-
+            _n = (((self.depth * self.height) * self.width) * self.channel_count)
+            _on = self.format
+            if _on == Sf3Image.Formats.uint16:
+                pass
+                self.samples = self._io.read_array_u2le(_n)
+            elif _on == Sf3Image.Formats.uint64:
+                pass
+                self.samples = self._io.read_array_u8le(_n)
+            elif _on == Sf3Image.Formats.int16:
+                pass
+                self.samples = self._io.read_array_s2le(_n)
+            elif _on == Sf3Image.Formats.uint32:
+                pass
+                self.samples = self._io.read_array_u4le(_n)
+            elif _on == Sf3Image.Formats.float16:
+                pass
+                # Kept as the raw half float bits rather than one F2 per
+                # sample, see sample_array().
+                self.samples = self._io.read_array_u2le(_n)
+            elif _on == Sf3Image.Formats.int8:
+                pass
+                self.samples = self._io.read_array_s1(_n)
+            elif _on == Sf3Image.Formats.float32:
+                pass
+                self.samples = self._io.read_array_f4le(_n)
+            elif _on == Sf3Image.Formats.uint8:
+                pass
+                self.samples = self._io.read_array_u1(_n)
+            elif _on == Sf3Image.Formats.float64:
+                pass
+                self.samples = self._io.read_array_f8le(_n)
+            elif _on == Sf3Image.Formats.int64:
+                pass
+                self.samples = self._io.read_array_s8le(_n)
+            elif _on == Sf3Image.Formats.int32:
+                pass
+                self.samples = self._io.read_array_s4le(_n)
 
 
         def _fetch_instances(self):
             pass
-            for i in range(len(self.samples)):
-                pass
-                _on = self.format
-                if _on == Sf3Image.Formats.uint16:
-                    pass
-                elif _on == Sf3Image.Formats.uint64:
-                    pass
-                elif _on == Sf3Image.Formats.int16:
-                    pass
-                elif _on == Sf3Image.Formats.uint32:
-                    pass
-                elif _on == Sf3Image.Formats.float16:
-                    pass
-                    self.samples[i]._fetch_instances()
-                elif _on == Sf3Image.Formats.int8:
-                    pass
-                elif _on == Sf3Image.Formats.float32:
-                    pass
-                elif _on == Sf3Image.Formats.uint8:
-                    pass
-                elif _on == Sf3Image.Formats.float64:
-                    pass
-                elif _on == Sf3Image.Formats.int64:
-                    pass
-                elif _on == Sf3Image.Formats.int32:
-                    pass
 
 
 
@@ -184,42 +162,40 @@ class Sf3Image(ReadWriteKaitaiStruct):
             self._io.write_u4le(self.depth)
             self._io.write_u1(int(self.channel_format))
             self._io.write_u1(int(self.format))
-            for i in range(len(self.samples)):
+            _on = self.format
+            if _on == Sf3Image.Formats.uint16:
+                pass
+                self._io.write_array_u2le(self.samples)
+            elif _on == Sf3Image.Formats.uint64:
+                pass
+                self._io.write_array_u8le(self.samples)
+            elif _on == Sf3Image.Formats.int16:
+                pass
+                self._io.write_array_s2le(self.samples)
+            elif _on == Sf3Image.Formats.uint32:
+                pass
+                self._io.write_array_u4le(self.samples)
+            elif _on == Sf3Image.Formats.float16:
+                pass
+                self._io.write_array_u2le(self.samples)
+            elif _on == Sf3Image.Formats.int8:
+                pass
+                self._io.write_array_s1(self.samples)
+            elif _on == Sf3Image.Formats.float32:
                 pass
-                _on = self.format
-                if _on == Sf3Image.Formats.uint16:
-                    pass
-                    self._io.write_u2le(self.samples[i])
-                elif _on == Sf3Image.Formats.uint64:
-                    pass
-                    self._io.write_u8le(self.samples[i])
-                elif _on == Sf3Image.Formats.int16:
-                    pass
-                    self._io.write_s2le(self.samples[i])
-                elif _on == Sf3Image.Formats.uint32:
-                    pass
-                    self._io.write_u4le(self.samples[i])
-                elif _on == Sf3Image.Formats.float16:
-                    pass
-                    self.samples[i]._write__seq(self._io)
-                elif _on == Sf3Image.Formats.int8:
-                    pass
-                    self._io.write_s1(self.samples[i])
-                elif _on == Sf3Image.Formats.float32:
-                    pass
-                    self._io.write_f4le(self.samples[i])
-                elif _on == Sf3Image.Formats.uint8:
-                    pass
-                    self._io.write_u1(self.samples[i])
-                elif _on == Sf3Image.Formats.float64:
-                    pass
-                    self._io.write_f8le(self.samples[i])
-                elif _on == Sf3Image.Formats.int64:
-                    pass
-                    self._io.write_s8le(self.samples[i])
-                elif _on == Sf3Image.Formats.int32:
-                    pass
-                    self._io.write_s4le(self.samples[i])
+                self._io.write_array_f4le(self.samples)
+            elif _on == Sf3Image.Formats.uint8:
+                pass
+                self._io.write_array_u1(self.samples)
+            elif _on == Sf3Image.Formats.float64:
+                pass
+                self._io.write_array_f8le(self.samples)
+            elif _on == Sf3Image.Formats.int64:
+                pass
+                self._io.write_array_s8le(self.samples)
+            elif _on == Sf3Image.Formats.int32:
+                pass
+                self._io.write_array_s4le(self.samples)
 
 
 
@@ -227,35 +203,6 @@ class Sf3Image(ReadWriteKaitaiStruct):
             pass
             if (len(self.samples) != (((self.depth * self.height) * self.width) * self.channel_count)):
                 raise kaitaistruct.ConsistencyError(u"samples", len(self.samples), (((self.depth * self.height) * self.width) * self.channel_count))
-            for i in range(len(self.samples)):
-                pass
-                _on = self.format
-                if _on == Sf3Image.Formats.uint16:
-                    pass
-                elif _on == Sf3Image.Formats.uint64:
-                    pass
-                elif _on == Sf3Image.Formats.int16:
-                    pass
-                elif _on == Sf3Image.Formats.uint32:
-                    pass
-                elif _on == Sf3Image.Formats.float16:
-                    pass
-                    if self.samples[i]._root != self._root:
-                        raise kaitaistruct.ConsistencyError(u"samples", self.samples[i]._root, self._root)
-                    if self.samples[i]._parent != self:
-                        raise kaitaistruct.ConsistencyError(u"samples", self.samples[i]._parent, self)
-                elif _on == Sf3Image.Formats.int8:
-                    pass
-                elif _on == Sf3Image.Formats.float32:
-                    pass
-                elif _on == Sf3Image.Formats.uint8:
-                    pass
-                elif _on == Sf3Image.Formats.float64:
-                    pass
-                elif _on == Sf3Image.Formats.int64:
-                    pass
-                elif _on == Sf3Image.Formats.int32:
-                    pass
 
 
         @property
@@ -269,6 +216,19 @@ class Sf3Image(ReadWriteKaitaiStruct):
         def _invalidate_channel_count(self):
             del self._m_channel_count
 
+        def sample_array(self):
+            """Returns the samples as a (depth, height, width, channel_count)
+            NumPy array of the format's type, sharing memory with the parsed
+            data. float16 samples are viewed as numpy.float16. Without NumPy,
+            the flat samples are returned as they are.
+            """
+            if numpy is None:
+                return self.samples
+            samples = numpy.asarray(self.samples)
+            if self.format == Sf3Image.Formats.float16:
+                samples = samples.view(numpy.float16)
+            return samples.reshape(self.depth, self.height, self.width, self.channel_count)
+
     class F2(ReadWriteKaitaiStruct):
         def __init__(self, _io=None, _parent=None, _root=None):
             self._io = _io
@@ -0,0 +1,91 @@
+# Meshlets of an Sf3Model, stored next to it in a .meshlets file with magic "\x81SF3MSHL".
+#
+# All values are little endian:
+#   magic           8 bytes
+#   max_vertices    u4   vertex limit the meshlets were built with
+#   max_triangles   u4   triangle limit the meshlets were built with
+#   meshlet_count   u4
+#   vertex_count    u4   length of vertices
+#   triangle_count  u4   number of triangles over all meshlets
+#   meshlets        u4[meshlet_count*4]
+#                   vertex offset, vertex count, triangle offset, triangle count
+#   bounds          f4[meshlet_count*8]
+#                   sphere center xyz and radius, cone axis xyz and cutoff
+#   vertices        u4[vertex_count]
+#                   indices into the vertices of the model
+#   triangles       u1[triangle_count*3]
+#                   indices into the meshlet's slice of vertices
+#
+# A meshlet is backfacing and can be culled when
+#   dot(center - camera, axis) >= cutoff * length(center - camera) + radius
+
+from . import kaitaistruct
+from .kaitaistruct import ReadWriteKaitaiStruct
+
+class Sf3Meshlets(ReadWriteKaitaiStruct):
+    MAGIC = b"\x81SF3MSHL"
+    MIME = "application/x.sf3-meshlets"
+    EXTENSION = ".meshlets"
+
+    def __init__(self, _io=None, _parent=None, _root=None):
+        self._io = _io
+        self._parent = _parent
+        self._root = _root if _root else self
+
+    def _read(self):
+        self.magic = self._io.read_bytes(8)
+        if not (self.magic == Sf3Meshlets.MAGIC):
+            raise kaitaistruct.ValidationNotEqualError(Sf3Meshlets.MAGIC, self.magic, self._io, u"/seq/0")
+        self.max_vertices = self._io.read_u4le()
+        self.max_triangles = self._io.read_u4le()
+        self.meshlet_count = self._io.read_u4le()
+        self.vertex_count = self._io.read_u4le()
+        self.triangle_count = self._io.read_u4le()
+        self.meshlets = self._io.read_array_u4le(self.meshlet_count * 4)
+        self.bounds = self._io.read_array_f4le(self.meshlet_count * 8)
+        self.vertices = self._io.read_array_u4le(self.vertex_count)
+        self.triangles = self._io.read_array_u1(self.triangle_count * 3)
+
+
+    def _fetch_instances(self):
+        pass
+
+
+    def _write__seq(self, io=None):
+        super(Sf3Meshlets, self)._write__seq(io)
+        self._io.write_bytes(self.magic)
+        self._io.write_u4le(self.max_vertices)
+        self._io.write_u4le(self.max_triangles)
+        self._io.write_u4le(self.meshlet_count)
+        self._io.write_u4le(self.vertex_count)
+        self._io.write_u4le(self.triangle_count)
+        self._io.write_array_u4le(self.meshlets)
+        self._io.write_array_f4le(self.bounds)
+        self._io.write_array_u4le(self.vertices)
+        self._io.write_array_u1(self.triangles)
+
+
+    def _check(self):
+        pass
+        if (len(self.magic) != 8):
+            raise kaitaistruct.ConsistencyError(u"magic", len(self.magic), 8)
+        if not (self.magic == Sf3Meshlets.MAGIC):
+            raise kaitaistruct.ValidationNotEqualError(Sf3Meshlets.MAGIC, self.magic, None, u"/seq/0")
+        if (len(self.meshlets) != self.meshlet_count * 4):
+            raise kaitaistruct.ConsistencyError(u"meshlets", len(self.meshlets), self.meshlet_count * 4)
+        if (len(self.bounds) != self.meshlet_count * 8):
+            raise kaitaistruct.ConsistencyError(u"bounds", len(self.bounds), self.meshlet_count * 8)
+        if (len(self.vertices) != self.vertex_count):
+            raise kaitaistruct.ConsistencyError(u"vertices", len(self.vertices), self.vertex_count)
+        if (len(self.triangles) != self.triangle_count * 3):
+            raise kaitaistruct.ConsistencyError(u"triangles", len(self.triangles), self.triangle_count * 3)
+
+    def meshlet(self, i):
+        """Returns the vertex indices, local triangle indices and bounds
+        (center, radius, axis, cutoff) of the ith meshlet.
+        """
+        (vertex_offset, vertex_count, triangle_offset, triangle_count) = self.meshlets[i*4:i*4+4]
+        b = self.bounds[i*8:i*8+8]
+        return (self.vertices[vertex_offset:vertex_offset+vertex_count],
+                self.triangles[triangle_offset*3:(triangle_offset+triangle_count)*3],
+                (tuple(b[0:3]), b[3], tuple(b[4:7]), b[7]))
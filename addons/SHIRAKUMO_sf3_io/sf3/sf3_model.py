@@ -1,9 +1,15 @@
 # This is a generated file! Please edit source .ksy file and use kaitai-struct-compiler to rebuild
 # type: ignore
 
+import array
 from . import kaitaistruct
 from .kaitaistruct import ReadWriteKaitaiStruct, KaitaiStream, BytesIO
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 if getattr(kaitaistruct, 'API_VERSION', (0, 9)) < (0, 11):
     raise Exception("Incompatible Kaitai Struct Python API: 0.11 or later is required, but you have %s" % (kaitaistruct.__version__))
@@ -121,6 +127,65 @@ class Sf3Model(ReadWriteKaitaiStruct):
                 raise kaitaistruct.ConsistencyError(u"vertex_data", self.vertex_data._parent, self)
 
 
+        def vertex_array(self):
+            """Returns the vertex buffer as an (N, vertex_stride) float32 NumPy
+            array sharing memory with the parsed data. Without NumPy, a 2D
+            memoryview of the same shape is returned instead.
+            """
+            return Sf3Model._matrix(self.vertex_data.vertices, KaitaiStream.typecode_f4, self.format.vertex_stride)
+
+        def face_array(self):
+            """Returns the face indices as an (F, 3) uint32 NumPy array sharing
+            memory with the parsed data. Without NumPy, a 2D memoryview of
+            the same shape is returned instead.
+            """
+            return Sf3Model._matrix(self.vertex_data.faces, KaitaiStream.typecode_u4, 3)
+
+        def attribute(self, name):
+            """Returns one vertex attribute (position, uv, color, normal or
+            tangent) as an (N, size) view into vertex_array(), or None if
+            the format does not have it. Without NumPy, the attribute is
+            copied into a flat array.array of N*size floats instead.
+            """
+            for (attr, offset, size) in self.format.attributes:
+                if attr == name:
+                    break
+            else:
+                return None
+            stride = self.format.vertex_stride
+            if numpy is not None:
+                return self.vertex_array()[:, offset:offset+size]
+            src = Sf3Model._flat_array(self.vertex_data.vertices, KaitaiStream.typecode_f4)
+            dst = array.array(KaitaiStream.typecode_f4, bytes(len(src) // stride * size * 4))
+            for i in range(size):
+                dst[i::size] = src[offset+i::stride]
+            return dst
+
+        def attributes(self):
+            """Returns a dict of every attribute in the vertex format, see
+            attribute().
+            """
+            return dict((attr, self.attribute(attr)) for (attr, offset, size) in self.format.attributes)
+
+
+    @staticmethod
+    def _flat_array(data, typecode):
+        if isinstance(data, array.array) and data.typecode == typecode:
+            return data
+        arr = array.array(typecode)
+        try:
+            arr.frombytes(memoryview(data).cast('B'))
+        except TypeError:
+            arr.extend(data)
+        return arr
+
+    @staticmethod
+    def _matrix(data, typecode, width):
+        if numpy is not None:
+            return numpy.asarray(data, dtype=typecode).reshape(-1, width)
+        flat = Sf3Model._flat_array(data, typecode)
+        return memoryview(flat).cast('B').cast(typecode, [len(flat) // width, width])
+
     class VertexFormat(ReadWriteKaitaiStruct):
         def __init__(self, _io=None, _parent=None, _root=None):
             self._io = _io
@@ -203,6 +268,24 @@ class Sf3Model(ReadWriteKaitaiStruct):
 
         def _invalidate_has_uv(self):
             del self._m_has_uv
+        @property
+        def attributes(self):
+            """List of (name, offset, size) of each attribute in a vertex."""
+            if hasattr(self, '_m_attributes'):
+                return self._m_attributes
+
+            self._m_attributes = []
+            offset = 0
+            for (name, size, present) in [('position', 3, self.has_position), ('uv', 2, self.has_uv),
+                                          ('color', 3, self.has_color), ('normal', 3, self.has_normal),
+                                          ('tangent', 3, self.has_tangent)]:
+                if present:
+                    self._m_attributes.append((name, offset, size))
+                    offset += size
+            return getattr(self, '_m_attributes', None)
+
+        def _invalidate_attributes(self):
+            del self._m_attributes
 
     class VertexData(ReadWriteKaitaiStruct):
         def __init__(self, _io=None, _parent=None, _root=None):
@@ -212,53 +295,29 @@ class Sf3Model(ReadWriteKaitaiStruct):
 
         def _read(self):
             self.face_count = self._io.read_u4le()
-            self.faces = []
-            for i in range(self.face_count):
-                self.faces.append(self._io.read_u4le())
-
+            self.faces = self._io.read_array_u4le(self.face_count)
             self.vertex_count = self._io.read_u4le()
-            self.vertices = []
-            for i in range(self.vertex_count):
-                self.vertices.append(self._io.read_f4le())
-
+            self.vertices = self._io.read_array_f4le(self.vertex_count)
 
 
         def _fetch_instances(self):
             pass
-            for i in range(len(self.faces)):
-                pass
-
-            for i in range(len(self.vertices)):
-                pass
-
 
 
         def _write__seq(self, io=None):
             super(Sf3Model.VertexData, self)._write__seq(io)
             self._io.write_u4le(self.face_count)
-            for i in range(len(self.faces)):
-                pass
-                self._io.write_u4le(self.faces[i])
-
+            self._io.write_array_u4le(self.faces)
             self._io.write_u4le(self.vertex_count)
-            for i in range(len(self.vertices)):
-                pass
-                self._io.write_f4le(self.vertices[i])
-
+            self._io.write_array_f4le(self.vertices)
 
 
         def _check(self):
             pass
             if (len(self.faces) != self.face_count):
                 raise kaitaistruct.ConsistencyError(u"faces", len(self.faces), self.face_count)
-            for i in range(len(self.faces)):
-                pass
-
             if (len(self.vertices) != self.vertex_count):
                 raise kaitaistruct.ConsistencyError(u"vertices", len(self.vertices), self.vertex_count)
-            for i in range(len(self.vertices)):
-                pass
-
 
 
     class MaterialType(ReadWriteKaitaiStruct):
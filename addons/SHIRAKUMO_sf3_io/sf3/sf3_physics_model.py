@@ -200,35 +200,23 @@ class Sf3PhysicsModel(ReadWriteKaitaiStruct):
 
         def _read(self):
             self.vertex_count = self._io.read_u2le()
-            self.vertices = []
-            for i in range((self.vertex_count * 3)):
-                self.vertices.append(self._io.read_f4le())
-
+            self.vertices = self._io.read_array_f4le((self.vertex_count * 3))
 
 
         def _fetch_instances(self):
             pass
-            for i in range(len(self.vertices)):
-                pass
-
 
 
         def _write__seq(self, io=None):
             super(Sf3PhysicsModel.Mesh, self)._write__seq(io)
             self._io.write_u2le(self.vertex_count)
-            for i in range(len(self.vertices)):
-                pass
-                self._io.write_f4le(self.vertices[i])
-
+            self._io.write_array_f4le(self.vertices)
 
 
         def _check(self):
             pass
             if (len(self.vertices) != (self.vertex_count * 3)):
                 raise kaitaistruct.ConsistencyError(u"vertices", len(self.vertices), (self.vertex_count * 3))
-            for i in range(len(self.vertices)):
-                pass
-
 
 
     class Pill(ReadWriteKaitaiStruct):
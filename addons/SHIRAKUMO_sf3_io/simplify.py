@@ -0,0 +1,270 @@
+import numpy as np
+
+## Quadric error mesh simplification (Garland & Heckbert 1997) by half-edge
+## collapses, done in rounds over NumPy arrays rather than one collapse at
+## a time. Each round takes the cheapest collapse of every position and
+## carries out at once all of those whose neighbourhoods don't overlap,
+## cheapest first. Quadrics are an (n, 10) array, and the triangles around
+## a set of positions are found by one pass over the triangle array, so
+## nothing is rebuilt per collapse.
+##
+## Collapses happen in position space so that split vertices don't tear the
+## surface apart. Any position that carries more than one vertex (a UV,
+## normal or color seam) or that sits on an open or non-manifold edge is
+## locked in place. It can still be collapsed onto, but never moves, so
+## seams and borders keep their shape and attributes.
+
+def plane_quadrics(positions, triangles, count):
+    ## Area weighted sum of the triangle plane quadrics around every
+    ## position, as the 10 unique coefficients of the symmetric 4x4 matrix.
+    p0 = positions[triangles[:,0]]
+    normals = np.cross(positions[triangles[:,1]] - p0, positions[triangles[:,2]] - p0)
+    lengths = np.linalg.norm(normals, axis=1)
+    normals /= np.maximum(lengths, 1e-30)[:,None]
+    (a, b, c) = normals.T
+    d = -np.einsum('ij,ij->i', normals, p0)
+    weights = lengths * 0.5
+    planes = np.stack([a*a, a*b, a*c, a*d, b*b, b*c, b*d, c*c, c*d, d*d], axis=1) * weights[:,None]
+    quadrics = np.zeros((count, 10), dtype=np.float64)
+    for corner in range(3):
+        for k in range(10):
+            quadrics[:,k] += np.bincount(triangles[:,corner], weights=planes[:,k], minlength=count)
+    return quadrics
+
+def locked_positions(triangles, wedges):
+    ## Positions on seams, borders, non-manifold or degenerate geometry.
+    count = len(wedges)
+    locked = 1 < wedges
+    edges = np.sort(triangles[:,[0,1,1,2,2,0]].reshape(-1, 2), axis=1).astype(np.int64)
+    keys, counts = np.unique(edges[:,0] * count + edges[:,1], return_counts=True)
+    bad = keys[counts != 2]
+    locked[bad // count] = True
+    locked[bad % count] = True
+    degenerate = triangles[(triangles[:,0] == triangles[:,1]) |
+                           (triangles[:,1] == triangles[:,2]) |
+                           (triangles[:,2] == triangles[:,0])]
+    locked[degenerate.ravel()] = True
+    return locked
+
+def monomials(points):
+    ## The terms a quadric's coefficients are multiplied with to evaluate it
+    ## at each of the points, so that Q(v) = dot(quadric, monomials(v)).
+    (x, y, z) = points.T
+    return np.stack([x*x, 2*x*y, 2*x*z, 2*x, y*y, 2*y*z, 2*y, z*z, 2*z, np.ones_like(x)], axis=1)
+
+def touching(triangles, marked):
+    ## Mask of the triangles with a corner in the marked positions.
+    return marked[triangles[:,0]] | marked[triangles[:,1]] | marked[triangles[:,2]]
+
+def cheapest_collapses(quadrics, terms, errors, triangles, positions, rejected, best_cost, best_target):
+    ## Updates the cheapest collapse of each of the given positions in
+    ## best_cost and best_target, skipping the rejected collapses.
+    ## Collapsing p onto q costs Q_p(q) + Q_q(q), the latter is errors[q].
+    count = len(quadrics)
+    marked = np.zeros(count, dtype=bool)
+    marked[positions] = True
+    around = triangles[touching(triangles, marked)]
+    # Free positions only have manifold edges, so every edge from one of
+    # them shows up once as a corner and the corner following it.
+    p = around.ravel()
+    q = around[:,[1,2,0]].ravel()
+    edges = np.flatnonzero(marked[p])
+    (p, q) = (p[edges], q[edges])
+    if len(rejected):
+        # Only few positions have a rejected collapse, so only theirs are
+        # looked up.
+        affected = np.zeros(count, dtype=bool)
+        affected[rejected // count] = True
+        edges = np.flatnonzero(affected[p])
+        edges = edges[np.isin(p[edges] * count + q[edges], rejected)]
+        (p, q) = (np.delete(p, edges), np.delete(q, edges))
+    costs = np.einsum('ij,ij->i', quadrics[p], terms[q]) + errors[q]
+    best_cost[positions] = np.inf
+    np.minimum.at(best_cost, p, costs)
+    hit = costs == best_cost[p]
+    best_target[p[hit]] = q[hit]
+
+def owners(triangles, positions, count):
+    ## (owner, triangle) pairs for the triangles around each of positions,
+    ## where owner is the index into positions. The stars of the positions
+    ## must not overlap.
+    index = np.full(count, -1)
+    index[positions] = np.arange(len(positions))
+    owner = np.maximum(np.maximum(index[triangles[:,0]], index[triangles[:,1]]), index[triangles[:,2]])
+    tris = np.flatnonzero(0 <= owner)
+    return (owner[tris], tris)
+
+def lowest_around(triangles, lowest, count):
+    ## For every position, the lowest of lowest over the corners of the
+    ## triangles around it.
+    corners = lowest[triangles]
+    around = np.minimum(np.minimum(corners[:,0], corners[:,1]), corners[:,2])
+    result = np.full(count, np.iinfo(np.int64).max)
+    np.minimum.at(result, triangles.ravel(), np.repeat(around, 3))
+    return result
+
+def independent(triangles, p, q, rank, count, passes=4):
+    ## Mask of collapses p -> q that can all be done at once. A collapse
+    ## changes the triangles around p and looks at those around q, so two
+    ## collapses can't go together if either changes a triangle the other
+    ## changes or looks at. Every pass takes the collapses that rank lower
+    ## than all others they conflict with and drops those that conflict
+    ## with one taken. Whatever is left after the last pass waits for the
+    ## next round.
+    n = len(p)
+    chosen = np.zeros(n, dtype=bool)
+    pending = np.ones(n, dtype=bool)
+    for _ in range(passes):
+        changes = np.full(count, n)
+        changes[p[pending]] = rank[pending]
+        looks = np.full(count, n)
+        np.minimum.at(looks, q[pending], rank[pending])
+        # Lowest rank changing, or changing or looking at, a triangle
+        # around each position
+        changed = lowest_around(triangles, changes, count)
+        touched = lowest_around(triangles, np.minimum(changes, looks), count)
+        won = pending & (touched[p] == rank) & (changed[q] == rank)
+        chosen |= won
+        # Positions on a triangle the winners change, or change or look at
+        marked = np.zeros(count, dtype=bool)
+        marked[p[won]] = True
+        changes = touching(triangles, marked)
+        marked[:] = False
+        marked[q[won]] = True
+        looks = touching(triangles, marked) | changes
+        (changed, touched) = (np.zeros(count, dtype=bool), np.zeros(count, dtype=bool))
+        changed[triangles[changes].ravel()] = True
+        touched[triangles[looks].ravel()] = True
+        pending &= ~(touched[p] | changed[q])
+        if not pending.any():
+            break
+    return chosen
+
+def priority(costs, p):
+    ## Ranks collapses by cost in half octave steps, scrambling the order
+    ## within a step. Costs vary smoothly over a surface, so ranking by
+    ## exact cost would leave few local minima to collapse per round.
+    steps = np.floor(np.log2(np.maximum(costs, 1e-30)) * 2).astype(np.int64)
+    scramble = (p * 2654435761) & 0xffffffff
+    rank = np.empty(len(p), dtype=np.int64)
+    rank[np.argsort((steps << 32) | scramble)] = np.arange(len(p))
+    return rank
+
+def normals(points, triangles):
+    p0 = points[triangles[:,0]]
+    return np.cross(points[triangles[:,1]] - p0, points[triangles[:,2]] - p0)
+
+def ring(owner, corners, count):
+    ## Sorted, distinct owner * count + position keys of the corners.
+    keys = np.sort((owner[:,None] * count + corners).ravel())
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+def validate(triangles, render, points, p, q, count):
+    ## Checks the collapses p -> q against the current mesh and returns
+    ## (valid, target, owner, tris, removed) where target is the vertex the
+    ## triangles keep in place of p and owner, tris are the collapse and
+    ## triangle pairs around each p, with removed marking those that
+    ## contain q. A collapse must remove triangles that all agree on the
+    ## vertex at q, keep the mesh manifold and flip none of the triangles
+    ## it keeps.
+    n = len(p)
+    (owner, tris) = owners(triangles, p, count)
+    corners = triangles[tris]
+    at_q = corners == q[owner][:,None]
+    removed = at_q[:,0] | at_q[:,1] | at_q[:,2]
+    losses = np.bincount(owner[removed], minlength=n)
+    # The vertex at q of every removed triangle must be the same one
+    r = render[tris[removed]][at_q[removed]]
+    lowest = np.full(n, np.iinfo(np.int64).max)
+    highest = np.full(n, -1)
+    np.minimum.at(lowest, owner[removed], r)
+    np.maximum.at(highest, owner[removed], r)
+    valid = (0 < losses) & (lowest == highest)
+    target = np.where(valid, lowest, 0)
+    # Link condition: p and q may only share the neighbours of the
+    # triangles that go away, besides each other.
+    (other_owner, other_tris) = owners(triangles, q, count)
+    keys = np.sort(np.concatenate((ring(owner, corners, count), ring(other_owner, triangles[other_tris], count))))
+    shared = keys[1:][keys[1:] == keys[:-1]] // count
+    valid &= np.bincount(shared, minlength=n) == losses + 2
+    # Reject anything that turns a kept triangle by more than ~75 degrees
+    kept = ~removed
+    moved = corners[kept]
+    before = normals(points, moved)
+    moved = np.where(moved == p[owner[kept]][:,None], q[owner[kept]][:,None], moved)
+    after = normals(points, moved)
+    dot = np.einsum('ij,ij->i', before, after)
+    bad = (dot <= 0.0) | (dot*dot < 0.0625*np.einsum('ij,ij->i', before, before)*np.einsum('ij,ij->i', after, after))
+    valid &= np.bincount(owner[kept][bad], minlength=n) == 0
+    return (valid, target, owner, tris, np.where(valid, losses, 0), removed)
+
+def simplify(positions, faces, target_count):
+    ## Returns a new index buffer with at most target_count triangles, or as
+    ## close to it as the locked positions allow. Vertices are only ever
+    ## referenced, never created, so the vertex buffer stays valid.
+    if len(faces) // 3 <= target_count:
+        return faces
+    (unique, position_of) = np.unique(positions, axis=0, return_inverse=True)
+    position_of = position_of.ravel()
+    count = len(unique)
+    render = faces.reshape(-1, 3).astype(np.int64)
+    triangles = position_of[render]
+    wedges = np.bincount(position_of, minlength=count)
+    locked = locked_positions(triangles, wedges)
+    points = unique.astype(np.float64)
+    quadrics = plane_quadrics(points, triangles, count)
+    terms = monomials(points)
+    errors = np.einsum('ij,ij->i', quadrics, terms)
+    # Collapses that failed validation are not tried again.
+    rejected = np.zeros(0, dtype=np.int64)
+    # The cheapest collapse of every position that is free to move, only
+    # updated where the mesh changed.
+    best_cost = np.full(count, np.inf)
+    best_target = np.zeros(count, dtype=np.int64)
+    dirty = np.flatnonzero(~locked)
+
+    while target_count < len(triangles):
+        if len(dirty):
+            cheapest_collapses(quadrics, terms, errors, triangles, dirty, rejected, best_cost, best_target)
+        p = np.flatnonzero(np.isfinite(best_cost))
+        if len(p) == 0:
+            break
+        # Only consider a few times as many as are still needed, so that the
+        # last rounds don't pick expensive collapses over cheap ones.
+        needed = max(len(triangles) - target_count, 1) * 2
+        if needed < len(p):
+            p = p[np.argpartition(best_cost[p], needed)[:needed]]
+        q = best_target[p]
+        chosen = independent(triangles, p, q, priority(best_cost[p], p), count)
+        p = p[chosen]
+        p = p[np.argsort(best_cost[p], kind='stable')]
+        q = best_target[p]
+        (valid, target, owner, tris, losses, removed) = validate(triangles, render, points, p, q, count)
+        rejected = np.union1d(rejected, p[~valid] * count + q[~valid])
+        # Stop as soon as the target is reached, cheapest first.
+        valid &= len(triangles) - (np.cumsum(losses) - losses) > target_count
+        (gone, onto) = (p[valid], q[valid])
+        # Everything around a collapse needs its costs updated
+        changed = np.zeros(count, dtype=bool)
+        changed[p[~valid]] = True
+        changed[gone] = True
+        changed[onto] = True
+        changed[triangles[touching(triangles, changed)].ravel()] = True
+        locked[gone] = True
+        best_cost[gone] = np.inf
+        dirty = np.flatnonzero(changed & ~locked)
+        if len(gone) == 0:
+            continue
+        keep = valid[owner]
+        dead = np.zeros(len(triangles), dtype=bool)
+        dead[tris[keep & removed]] = True
+        moved = tris[keep & ~removed]
+        movers = owner[keep & ~removed]
+        (rows, cols) = np.nonzero(triangles[moved] == p[movers][:,None])
+        triangles[moved[rows], cols] = q[movers[rows]]
+        render[moved[rows], cols] = target[movers[rows]]
+        quadrics[onto] += quadrics[gone]
+        errors[onto] = np.einsum('ij,ij->i', quadrics[onto], terms[onto])
+        triangles = triangles[~dead]
+        render = render[~dead]
+    return render.astype(faces.dtype).ravel()
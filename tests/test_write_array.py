@@ -0,0 +1,70 @@
+# Checks that the bulk write_array_* writers produce the same bytes as the
+# per-element writers they replaced. Run with python -m unittest from the
+# repository root.
+
+import array
+import os
+import sys
+import unittest
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'addons', 'SHIRAKUMO_sf3_io'))
+from sf3.kaitaistruct import KaitaiStream
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+VERTICES = [0.0, -1.5, 3.25, 1e-30, -0.0, 123456.789, float('inf'), 2.0**-126]
+INDICES = [0, 1, 2, 2, 1, 3, 65535, 4294967295]
+SAMPLES_U1 = [0, 1, 127, 128, 254, 255]
+SAMPLES_U2 = [0, 1, 255, 256, 32767, 65535]
+
+def per_element(write, values):
+    io = KaitaiStream(BytesIO())
+    for value in values:
+        getattr(io, write)(value)
+    return io._io.getvalue()
+
+def bulk(write, values):
+    io = KaitaiStream(BytesIO())
+    getattr(io, write)(values)
+    return io._io.getvalue()
+
+class WriteArrayTest(unittest.TestCase):
+    CASES = [
+        ('write_f4le', 'write_array_f4le', KaitaiStream.typecode_f4, VERTICES, '<f4'),
+        ('write_f4be', 'write_array_f4be', KaitaiStream.typecode_f4, VERTICES, '>f4'),
+        ('write_u4le', 'write_array_u4le', KaitaiStream.typecode_u4, INDICES, '<u4'),
+        ('write_u4be', 'write_array_u4be', KaitaiStream.typecode_u4, INDICES, '>u4'),
+        ('write_u2le', 'write_array_u2le', KaitaiStream.typecode_u2, SAMPLES_U2, '<u2'),
+        ('write_u1', 'write_array_u1', KaitaiStream.typecode_u1, SAMPLES_U1, 'u1'),
+    ]
+
+    def test_list(self):
+        for (one, many, typecode, values, dtype) in self.CASES:
+            self.assertEqual(bulk(many, values), per_element(one, values), many)
+
+    def test_array(self):
+        for (one, many, typecode, values, dtype) in self.CASES:
+            self.assertEqual(bulk(many, array.array(typecode, values)), per_element(one, values), many)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy(self):
+        for (one, many, typecode, values, dtype) in self.CASES:
+            expected = per_element(one, values)
+            native = numpy.array(values, dtype=numpy.dtype(dtype).newbyteorder('='))
+            self.assertEqual(bulk(many, native), expected, many)
+            # Wider types get converted first
+            self.assertEqual(bulk(many, native.astype(numpy.float64 if dtype[-2] == 'f' else numpy.uint64)), expected, many)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy_strided(self):
+        for (one, many, typecode, values, dtype) in self.CASES:
+            interleaved = numpy.zeros(len(values) * 2, dtype=numpy.dtype(dtype).newbyteorder('='))
+            interleaved[::2] = values
+            self.assertEqual(bulk(many, interleaved[::2]), per_element(one, values), many)
+
+if __name__ == '__main__':
+    unittest.main()